@@ -8,6 +8,9 @@ import sys
 from flask import Flask
 from flask_cors import CORS
 from config import Config
+from app.models.database import Database
+from app.models.cache import chart_cache
+from app.models.versions import data_versions
 
 
 def get_resource_path(relative_path):
@@ -39,6 +42,14 @@ def create_app(config_class=Config):
     
     CORS(app)
     
+    # Pool de conexiones por petición
+    Database.init_app(app)
+    
+    # Caché de respuestas de gráficas (se invalida con cada escritura)
+    chart_cache.init_app(app, Database)
+    # Versiones de datos para ETag / 304 en las APIs de lectura
+    data_versions.init_app(Database)
+    
     # Registrar blueprints
     from app.controllers.main_controller import main_bp
     from app.controllers.workout_controller import workout_bp
@@ -47,6 +58,7 @@ def create_app(config_class=Config):
     from app.controllers.selfcare_controller import selfcare_bp
     from app.controllers.auth_controller import auth_bp
     from app.controllers.charts_controller import charts_bp
+    from app.controllers.export_controller import export_bp
     
     app.register_blueprint(main_bp)
     app.register_blueprint(workout_bp, url_prefix='/workout')
@@ -55,5 +67,10 @@ def create_app(config_class=Config):
     app.register_blueprint(selfcare_bp, url_prefix='/selfcare')
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(charts_bp, url_prefix='/charts')
+    app.register_blueprint(export_bp, url_prefix='/export')
+    
+    # Comandos CLI (flask rebuild-rollups, ...)
+    from app.commands import register_commands
+    register_commands(app)
     
     return app
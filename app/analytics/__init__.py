@@ -0,0 +1,3 @@
+"""
+Análisis numérico de métricas (NumPy)
+"""
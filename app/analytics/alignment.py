@@ -0,0 +1,141 @@
+"""
+Alineación por fecha de métricas con distinta frecuencia
+Construye una matriz densa (días x métricas) sobre el calendario del rango, con NaN donde
+no hay dato, y rellena los huecos según el modo elegido:
+
+    drop    sin relleno; cada cálculo usa solo los días en que las métricas tienen dato
+    ffill   repite el último valor registrado
+    linear  interpola entre el registro anterior y el siguiente (sin extrapolar)
+    weekly  media semanal (semanas de lunes a domingo)
+
+Las fechas son días desde 1970-01-01 (int32), como en el formato columnar.
+"""
+
+import numpy as np
+from app.analytics.columnar import points_to_columns
+
+
+GAP_MODES = {
+    'drop': 'Solo días con dato',
+    'ffill': 'Repetir último valor',
+    'linear': 'Interpolación lineal',
+    'weekly': 'Media semanal',
+}
+
+# 1970-01-01 fue jueves: el lunes de la semana del día d es d - (d + 3) % 7
+_WEEK_OFFSET = 3
+
+
+def day_number(value):
+    """Fecha (date o 'YYYY-MM-DD') como días desde 1970-01-01."""
+    return int(np.datetime64(str(value)[:10], 'D').astype(np.int64))
+
+
+def day_strings(days):
+    """Días desde 1970-01-01 como fechas 'YYYY-MM-DD'."""
+    return np.asarray(days).astype('datetime64[D]').astype(str).tolist()
+
+
+def dense_grid(days, values, first_day, length):
+    """Coloca una serie (días, valores) en un calendario de `length` días desde first_day."""
+    grid = np.full(length, np.nan)
+    offsets = np.asarray(days, dtype=np.int64) - first_day
+    inside = (offsets >= 0) & (offsets < length)
+    grid[offsets[inside]] = np.asarray(values, dtype=np.float64)[inside]
+    return grid
+
+
+def _previous_observation(present):
+    """Índice del último día con dato en o antes de cada día (-1 si no hay)."""
+    index = np.where(present, np.arange(len(present))[:, None], -1)
+    return np.maximum.accumulate(index, axis=0)
+
+
+def _next_observation(present):
+    """Índice del primer día con dato en o después de cada día (n si no hay)."""
+    n = len(present)
+    index = np.where(present, np.arange(n)[:, None], n)
+    return np.minimum.accumulate(index[::-1], axis=0)[::-1]
+
+
+def forward_fill(values, limit=None):
+    """Repite el último valor en cada columna; con `limit`, como mucho `limit` días."""
+    present = ~np.isnan(values)
+    previous = _previous_observation(present)
+    filled = np.take_along_axis(values, np.maximum(previous, 0), axis=0)
+    valid = previous >= 0
+    if limit is not None:
+        valid &= np.arange(len(values))[:, None] - previous <= limit
+    return np.where(valid, filled, np.nan)
+
+
+def interpolate(values, limit=None):
+    """Interpolación lineal en cada columna; con `limit`, solo huecos de hasta `limit` días."""
+    n = len(values)
+    present = ~np.isnan(values)
+    previous = _previous_observation(present)
+    following = _next_observation(present)
+    valid = (previous >= 0) & (following < n)
+    if limit is not None:
+        valid &= following - previous - 1 <= limit
+    left = np.take_along_axis(values, np.clip(previous, 0, n - 1), axis=0)
+    right = np.take_along_axis(values, np.clip(following, 0, n - 1), axis=0)
+    span = following - previous
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(span > 0, (np.arange(n)[:, None] - previous) / span, 0.0)
+    return np.where(valid, left + fraction * (right - left), np.nan)
+
+
+def weekly_mean(days, values):
+    """Media por semana de cada columna. Devuelve (lunes de cada semana, medias con NaN)."""
+    if len(days) == 0:
+        return days, values
+    week_start = days - (days + _WEEK_OFFSET) % 7
+    weeks, position = np.unique(week_start, return_inverse=True)
+    present = ~np.isnan(values)
+    totals = np.zeros((len(weeks), values.shape[1]))
+    counts = np.zeros((len(weeks), values.shape[1]))
+    np.add.at(totals, position, np.where(present, values, 0.0))
+    np.add.at(counts, position, present)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return weeks.astype(np.int32), totals / counts
+
+
+def align_columns(columns, metric_ids, start_date, end_date, gaps='drop', limit=None):
+    """
+    Alinea series columnares {metric_id: (días, valores)} sobre el calendario diario
+    [start_date, end_date] y rellena los huecos según `gaps`.
+    Devuelve (días int32, matriz float de forma (n_días, n_métricas) con NaN).
+    """
+    if gaps not in GAP_MODES:
+        raise ValueError(f"gaps debe ser uno de: {', '.join(GAP_MODES)}")
+    first_day = day_number(start_date)
+    length = max(day_number(end_date) - first_day + 1, 0)
+    days = np.arange(first_day, first_day + length, dtype=np.int32)
+    values = np.full((length, len(metric_ids)), np.nan)
+    for column, metric_id in enumerate(metric_ids):
+        if metric_id in columns:
+            values[:, column] = dense_grid(*columns[metric_id], first_day, length)
+
+    if length == 0 or gaps == 'drop':
+        return days, values
+    if gaps == 'ffill':
+        return days, forward_fill(values, limit)
+    if gaps == 'linear':
+        return days, interpolate(values, limit)
+    return weekly_mean(days, values)
+
+
+def align_points(series, metric_ids, start_date, end_date, gaps='drop', limit=None):
+    """Como align_columns, para series {metric_id: [{'date', 'value'}, ...]}."""
+    columns = {
+        metric_id: points_to_columns(series[metric_id])
+        for metric_id in metric_ids if series.get(metric_id)
+    }
+    return align_columns(columns, metric_ids, start_date, end_date, gaps, limit)
+
+
+def complete_rows(days, values):
+    """Solo los días en que todas las columnas tienen dato."""
+    keep = ~np.isnan(values).any(axis=1)
+    return days[keep], values[keep]
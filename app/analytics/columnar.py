@@ -0,0 +1,66 @@
+"""
+Formato columnar compacto para las series de las gráficas
+Por métrica: días desde 1970-01-01 (int32) y valores (float64), little-endian
+
+Binario (application/vnd.gymgraph.columnar):
+    'GGC1' | nº de métricas (uint16)
+    por métrica: longitud del id (uint8) | id (utf-8) | n (uint32) | días int32[n] | valores float64[n]
+
+JSON (application/vnd.gymgraph.columnar+json):
+    {"format": "columnar", "epoch": "1970-01-01",
+     "metrics": {id: {"count": n, "days": base64, "values": base64}}}
+"""
+
+import base64
+import struct
+import numpy as np
+from app.analytics.downsampling import lttb_indices
+
+
+COLUMNAR_MIMETYPE = 'application/vnd.gymgraph.columnar'
+COLUMNAR_JSON_MIMETYPE = 'application/vnd.gymgraph.columnar+json'
+MAGIC = b'GGC1'
+
+
+def points_to_columns(points):
+    """Convierte [{'date', 'value'}] en (días int32, valores float64)."""
+    days = np.array([p['date'][:10] for p in points], dtype='datetime64[D]').astype(np.int32)
+    values = np.array([p['value'] for p in points], dtype=np.float64)
+    return days, values
+
+
+def downsample_columns(days, values, max_points):
+    """Reduce una serie columnar con LTTB a como mucho max_points puntos."""
+    if max_points is None or len(days) <= max_points:
+        return days, values
+    indices = lttb_indices(days.astype(np.float64), values, max_points)
+    return days[indices], values[indices]
+
+
+def _buffers(days, values):
+    return days.astype('<i4').tobytes(), values.astype('<f8').tobytes()
+
+
+def encode_base64(columns):
+    """Documento JSON con las columnas en base64."""
+    metrics = {}
+    for metric_id, (days, values) in columns.items():
+        days_bytes, values_bytes = _buffers(days, values)
+        metrics[metric_id] = {
+            'count': int(len(days)),
+            'days': base64.b64encode(days_bytes).decode('ascii'),
+            'values': base64.b64encode(values_bytes).decode('ascii'),
+        }
+    return {'format': 'columnar', 'epoch': '1970-01-01', 'metrics': metrics}
+
+
+def encode_binary(columns):
+    """Cuerpo binario con todas las métricas."""
+    parts = [MAGIC, struct.pack('<H', len(columns))]
+    for metric_id, (days, values) in columns.items():
+        name = metric_id.encode('utf-8')
+        parts.append(struct.pack('<B', len(name)))
+        parts.append(name)
+        parts.append(struct.pack('<I', len(days)))
+        parts.extend(_buffers(days, values))
+    return b''.join(parts)
@@ -0,0 +1,84 @@
+"""
+Correlaciones entre métricas con NumPy
+Reciben matrices (días x métricas) con NaN donde no hay dato (ver app/analytics/alignment.py)
+"""
+
+import numpy as np
+
+
+def correlation_matrix(values, min_points=3):
+    """
+    Pearson de todas las parejas de columnas usando, en cada pareja,
+    solo las fechas en las que ambas tienen dato.
+    Devuelve (matriz de correlaciones con NaN si no se puede calcular, matriz de puntos comunes).
+    """
+    present = ~np.isnan(values)
+    mask = present.astype(float)
+    x = np.where(present, values, 0.0)
+
+    # Para cada pareja (i, j), sumas sobre las fechas comunes
+    counts = mask.T @ mask
+    sum_x = x.T @ mask            # sum_x[i, j] = suma de la métrica i donde j también tiene dato
+    sum_y = sum_x.T
+    sum_xx = (x * x).T @ mask
+    sum_yy = sum_xx.T
+    sum_xy = x.T @ x
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sum_xy - sum_x * sum_y / counts
+        var_x = sum_xx - sum_x * sum_x / counts
+        var_y = sum_yy - sum_y * sum_y / counts
+        corr = cov / np.sqrt(var_x * var_y)
+
+    # Varianza nula (o casi nula por redondeo) o pocos puntos: sin correlación
+    invalid = (counts < min_points) | (var_x <= 1e-12 * sum_xx) | (var_y <= 1e-12 * sum_yy)
+    corr[invalid] = np.nan
+    np.clip(corr, -1.0, 1.0, out=corr)
+    return corr, counts.astype(int)
+
+
+def strongest_pairs(metric_ids, corr, counts, limit=10):
+    """Parejas distintas ordenadas por |r| descendente."""
+    rows, cols = np.triu_indices(len(metric_ids), k=1)
+    pair_corr = corr[rows, cols]
+    valid = ~np.isnan(pair_corr)
+    rows, cols, pair_corr = rows[valid], cols[valid], pair_corr[valid]
+    order = np.argsort(-np.abs(pair_corr), kind='stable')[:limit]
+    return [
+        {
+            'metric1': metric_ids[rows[i]],
+            'metric2': metric_ids[cols[i]],
+            'correlation': round(float(pair_corr[i]), 4),
+            'common_points': int(counts[rows[i], cols[i]]),
+        }
+        for i in order
+    ]
+
+
+def lagged_correlation(x, y, max_lag, min_points=3):
+    """
+    Pearson entre x[t] e y[t + lag] para cada lag en [-max_lag, max_lag].
+    x tiene n días; y cubre los mismos días ampliados max_lag por cada lado (n + 2·max_lag).
+    Devuelve (lags, correlaciones con NaN, puntos comunes).
+    """
+    n = len(x)
+    lags = np.arange(-max_lag, max_lag + 1)
+    # Fila k: y desplazado lags[k] días respecto a x
+    windows = np.lib.stride_tricks.sliding_window_view(y, n)
+    present = ~np.isnan(windows) & ~np.isnan(x)
+    counts = present.sum(axis=1)
+    xs = np.where(present, x, 0.0)
+    ys = np.where(present, windows, 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sum_x, sum_y = xs.sum(axis=1), ys.sum(axis=1)
+        sum_xx, sum_yy = (xs * xs).sum(axis=1), (ys * ys).sum(axis=1)
+        cov = (xs * ys).sum(axis=1) - sum_x * sum_y / counts
+        var_x = sum_xx - sum_x * sum_x / counts
+        var_y = sum_yy - sum_y * sum_y / counts
+        corr = cov / np.sqrt(var_x * var_y)
+
+    invalid = (counts < min_points) | (var_x <= 1e-12 * sum_xx) | (var_y <= 1e-12 * sum_yy)
+    corr[invalid] = np.nan
+    np.clip(corr, -1.0, 1.0, out=corr)
+    return lags, corr, counts
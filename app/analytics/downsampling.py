@@ -0,0 +1,49 @@
+"""
+Reducción de puntos para gráficas largas
+Largest-Triangle-Three-Buckets (LTTB): conserva la forma visual de la serie
+"""
+
+import numpy as np
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Índices de los puntos que conserva LTTB (siempre incluye el primero y el último).
+    x debe estar ordenado de forma creciente.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # n - 2 puntos intermedios repartidos en threshold - 2 cubos
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    # Media de cada cubo (la usa el cubo anterior como tercer vértice)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:-1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:-1], edges[:-1]) / counts
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 1 < threshold - 2:
+            c_x, c_y = mean_x[bucket + 1], mean_y[bucket + 1]
+        else:
+            c_x, c_y = x[-1], y[-1]
+        # Doble del área del triángulo (a, b, c) para cada candidato b del cubo
+        area = np.abs(
+            (x[a] - c_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (c_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[bucket + 1] = a
+    return selected
+
+
+def downsample_points(points, max_points):
+    """Reduce una serie [{'date', 'value'}] a como mucho max_points puntos con LTTB."""
+    if max_points is None or len(points) <= max_points:
+        return points
+    x = np.array([p['date'][:10] for p in points], dtype='datetime64[D]').astype(float)
+    y = np.array([p['value'] for p in points], dtype=float)
+    return [points[i] for i in lttb_indices(x, y, max_points)]
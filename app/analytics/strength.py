@@ -0,0 +1,132 @@
+"""
+Estimaciones de fuerza a partir de las series registradas
+El motor de progresión trabaja con columnas NumPy (una fila por serie) y resume cada
+sesión de cada ejercicio sin bucles por fila: 1RM estimado, mejor serie y volumen.
+"""
+
+import numpy as np
+
+
+# Epley: 1RM = peso · (1 + reps / 30); con una repetición, el propio peso
+EPLEY_SQL = "CASE WHEN {reps} = 1 THEN {weight} ELSE {weight} * (1 + {reps} / 30.0) END"
+
+# Brzycki: 1RM = peso · 36 / (37 - reps); solo tiene sentido por debajo de 37 repeticiones
+BRZYCKI_SQL = "CASE WHEN {reps} < 37 THEN {weight} * 36.0 / (37 - {reps}) END"
+
+FORMULAS = {
+    'epley': EPLEY_SQL,
+    'brzycki': BRZYCKI_SQL,
+}
+
+# Repeticiones efectivas con RPE: las que se hicieron más las que quedaban en reserva (10 - RPE)
+EFFECTIVE_REPS_SQL = "({reps} + CASE WHEN {rpe} BETWEEN 1 AND 10 THEN 10 - {rpe} ELSE 0 END)"
+
+# 1RM estimado de la aplicación (récords, gráfica e1rm y progresión por defecto):
+# Epley con las repeticiones efectivas por RPE
+DEFAULT_FORMULA = 'epley'
+
+
+def estimate_1rm(weight_kg, reps, rpe=None):
+    """
+    1RM estimado de una serie (Epley, ajustado por RPE como e1rm_sql);
+    None si la serie no sirve para estimarlo.
+    """
+    if not weight_kg or not reps or weight_kg <= 0 or reps <= 0:
+        return None
+    if rpe is not None and 1 <= rpe <= 10:
+        reps = reps + 10 - rpe
+    if reps == 1:
+        return float(weight_kg)
+    return weight_kg * (1 + reps / 30.0)
+
+
+def e1rm_sql(weight, reps, rpe=None, formula=DEFAULT_FORMULA):
+    """Expresión SQL del 1RM estimado; con `rpe`, ajustado por repeticiones en reserva."""
+    if rpe is not None:
+        reps = EFFECTIVE_REPS_SQL.format(reps=reps, rpe=rpe)
+    return FORMULAS[formula].format(weight=weight, reps=reps)
+
+
+def effective_reps(reps, rpe):
+    """Repeticiones más las de reserva (10 - RPE) cuando el RPE es válido (1-10)."""
+    valid = (rpe >= 1) & (rpe <= 10)
+    return reps + np.where(valid, 10 - np.where(valid, rpe, 10), 0)
+
+
+def estimate_1rm_array(weight, reps, rpe=None, formula=DEFAULT_FORMULA):
+    """
+    1RM estimado de cada serie (arrays). NaN para series sin peso o repeticiones válidas.
+    Con `rpe` (NaN = sin dato) se usan las repeticiones efectivas.
+    """
+    weight = np.asarray(weight, dtype=np.float64)
+    reps = np.asarray(reps, dtype=np.float64)
+    valid = (weight > 0) & (reps > 0)
+    if rpe is not None:
+        with np.errstate(invalid='ignore'):
+            reps = effective_reps(reps, np.asarray(rpe, dtype=np.float64))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if formula == 'epley':
+            result = np.where(reps == 1, weight, weight * (1 + reps / 30.0))
+        elif formula == 'brzycki':
+            valid &= reps < 37
+            result = weight * 36.0 / (37 - reps)
+        else:
+            raise ValueError(f"formula debe ser una de: {', '.join(FORMULAS)}")
+    return np.where(valid, result, np.nan)
+
+
+def session_summary(exercise_ids, session_ids, days, weight, reps, rpe=None, formula=DEFAULT_FORMULA):
+    """
+    Resumen por (ejercicio, sesión) de series ordenadas por ejercicio y sesión.
+    Con `rpe` el 1RM se ajusta por repeticiones en reserva (NaN = serie sin RPE).
+    Devuelve un dict de arrays alineados, una posición por sesión de cada ejercicio:
+    exercise_id, session_id, day, e1rm (máximo de la sesión), best_weight, best_reps, best_rpe
+    (la serie con ese máximo), volume (peso x reps) y sets.
+    """
+    exercise_ids = np.asarray(exercise_ids)
+    session_ids = np.asarray(session_ids)
+    n = len(exercise_ids)
+    if n == 0:
+        empty = np.empty(0)
+        return {key: empty for key in ('exercise_id', 'session_id', 'day', 'e1rm', 'best_weight',
+                                        'best_reps', 'best_rpe', 'volume', 'sets')}
+    weight = np.asarray(weight, dtype=np.float64)
+    reps = np.asarray(reps, dtype=np.float64)
+    estimates = estimate_1rm_array(weight, reps, rpe, formula)
+    rpe = np.full(n, np.nan) if rpe is None else np.asarray(rpe, dtype=np.float64)
+
+    # Comienzo de cada grupo (cambio de ejercicio o de sesión)
+    changes = (exercise_ids[1:] != exercise_ids[:-1]) | (session_ids[1:] != session_ids[:-1])
+    starts = np.flatnonzero(np.concatenate(([True], changes)))
+    group = np.cumsum(np.concatenate(([True], changes))) - 1
+
+    # Mejor serie de cada grupo: última posición al ordenar por (grupo, 1RM)
+    order = np.lexsort((np.nan_to_num(estimates, nan=-np.inf), group))
+    ends = np.concatenate((starts[1:], [n])) - 1
+    best = order[ends]
+
+    volume_per_set = np.where((weight > 0) & (reps > 0), weight * reps, 0.0)
+    return {
+        'exercise_id': exercise_ids[starts],
+        'session_id': session_ids[starts],
+        'day': np.asarray(days)[starts],
+        'e1rm': estimates[best],
+        'best_weight': weight[best],
+        'best_reps': reps[best],
+        'best_rpe': rpe[best],
+        'volume': np.add.reduceat(volume_per_set, starts),
+        'sets': np.diff(np.concatenate((starts, [n]))),
+    }
+
+
+def split_by_exercise(summary):
+    """{exercise_id: resumen de sus sesiones} a partir de session_summary."""
+    exercise_ids = summary['exercise_id']
+    if len(exercise_ids) == 0:
+        return {}
+    _, starts = np.unique(exercise_ids, return_index=True)
+    bounds = np.concatenate((np.sort(starts), [len(exercise_ids)]))
+    return {
+        int(exercise_ids[start]): {key: values[start:end] for key, values in summary.items()}
+        for start, end in zip(bounds[:-1], bounds[1:])
+    }
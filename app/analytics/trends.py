@@ -0,0 +1,107 @@
+"""
+Líneas de tendencia sobre series de métricas
+Media y suma móviles (sumas acumuladas sobre el calendario diario) y media exponencial, en O(n)
+Las ventanas se miden en días de calendario, no en número de puntos
+"""
+
+import re
+from datetime import date, timedelta
+import numpy as np
+from app.analytics.alignment import dense_grid
+from app.analytics.columnar import points_to_columns
+
+
+# Métrica derivada: '<métrica>:<transformación><días>', p. ej. 'weight:ma7', 'steps:ema14'
+# o 'exercise_volume:120:ma28' (la métrica base puede llevar parámetro)
+DERIVED_METRIC_RE = re.compile(r'^(?P<base>\w+(?::\d+)?):(?P<kind>ma|sum|ema)(?P<window>\d+)$')
+
+TREND_KINDS = {
+    'ma': 'Media móvil',
+    'sum': 'Suma móvil',
+    'ema': 'Media exponencial',
+}
+
+MAX_WINDOW = 365
+
+
+def parse_derived_metric(metric_id):
+    """Devuelve (métrica base, transformación, días) o None si no es una métrica derivada válida."""
+    match = DERIVED_METRIC_RE.match(metric_id)
+    if not match:
+        return None
+    window = int(match.group('window'))
+    if not 1 <= window <= MAX_WINDOW:
+        return None
+    return match.group('base'), match.group('kind'), window
+
+
+def warmup_days(kind, window):
+    """Días previos al rango que hacen falta para que el primer valor sea correcto."""
+    if kind == 'ema':
+        # Peso de lo anterior a 3 ventanas: (1 - 2/(n+1))^(3n) < 5%
+        return 3 * window
+    return window - 1
+
+
+def _day_number(point):
+    return date.fromisoformat(point['date'][:10]).toordinal()
+
+
+def rolling(points, window, mean=True):
+    """
+    Media (o suma) de los valores de los últimos `window` días para cada punto.
+    Se calcula con sumas acumuladas sobre el calendario diario (ver app/analytics/alignment.py).
+    """
+    if not points:
+        return []
+    days, values = points_to_columns(points)
+    first_day = int(days[0])
+    grid = dense_grid(days, values, first_day, int(days[-1]) - first_day + 1)
+    present = ~np.isnan(grid)
+    # Acumulados con un cero delante: la ventana que acaba en el día d es acc[d + 1] - acc[d + 1 - window]
+    totals = np.concatenate(([0.0], np.cumsum(np.where(present, grid, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(present)))
+    end = days.astype(np.int64) - first_day + 1
+    begin = np.maximum(end - window, 0)
+    sums = totals[end] - totals[begin]
+    result = sums / (counts[end] - counts[begin]) if mean else sums
+    return [
+        {'date': point['date'], 'value': round(float(value), 2)}
+        for point, value in zip(points, result)
+    ]
+
+
+def exponential(points, span):
+    """
+    Media exponencial con alpha = 2 / (span + 1) por día.
+    Los huecos entre registros se descuentan como días sin observación.
+    """
+    alpha = 2.0 / (span + 1)
+    result = []
+    average = None
+    previous_day = None
+    for point in points:
+        day = _day_number(point)
+        if average is None:
+            average = point['value']
+        else:
+            decay = (1 - alpha) ** (day - previous_day)
+            average = average * decay + point['value'] * (1 - decay)
+        previous_day = day
+        result.append({'date': point['date'], 'value': round(average, 2)})
+    return result
+
+
+def apply_trend(points, kind, window):
+    """Calcula la transformación `kind` sobre una serie ordenada por fecha."""
+    if kind == 'ma':
+        return rolling(points, window, mean=True)
+    if kind == 'sum':
+        return rolling(points, window, mean=False)
+    return exponential(points, window)
+
+
+def extended_start(start_date, derived):
+    """Fecha desde la que hay que pedir las series base para las métricas derivadas."""
+    days = max((warmup_days(kind, window) for _, kind, window in derived), default=0)
+    return (date.fromisoformat(start_date) - timedelta(days=days)).isoformat()
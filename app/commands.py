@@ -0,0 +1,62 @@
+"""
+Comandos de mantenimiento (flask <comando>)
+"""
+
+import os
+import sys
+import click
+from app.models.rollup import DailyMetrics
+from app.models.records import PersonalRecord
+from app.models.export import EXPORT_TABLES, iter_ndjson, iter_csv
+
+
+def register_commands(app):
+    """Registra los comandos CLI de la aplicación."""
+
+    @app.cli.command('rebuild-rollups')
+    @click.option('--user', 'user_id', type=int, default=None,
+                  help='Reconstruir solo los agregados de este usuario.')
+    def rebuild_rollups(user_id):
+        """Reconstruye la tabla daily_metrics desde los registros."""
+        rows = DailyMetrics.rebuild(user_id)
+        click.echo(f"✓ daily_metrics reconstruida ({rows} filas)")
+
+    @app.cli.command('rebuild-records')
+    @click.option('--user', 'user_id', type=int, default=None,
+                  help='Reconstruir solo los récords de este usuario.')
+    def rebuild_records(user_id):
+        """Reconstruye la tabla personal_records desde las series."""
+        rows = PersonalRecord.rebuild(user_id)
+        click.echo(f"✓ personal_records reconstruida ({rows} filas)")
+
+    @app.cli.command('export-data')
+    @click.option('--user', 'user_id', type=int, default=1, show_default=True,
+                  help='Usuario a exportar.')
+    @click.option('--format', 'export_format', type=click.Choice(['ndjson', 'csv']),
+                  default='ndjson', show_default=True)
+    @click.option('--output', default='-', show_default=True,
+                  help='Fichero NDJSON ("-" = salida estándar) o directorio para los CSV.')
+    def export_data(user_id, export_format, output):
+        """Exporta todo el historial de un usuario sin cargarlo en memoria."""
+        if export_format == 'ndjson':
+            if output == '-':
+                _write_chunks(sys.stdout, iter_ndjson(user_id))
+            else:
+                with open(output, 'w', encoding='utf-8', newline='') as f:
+                    _write_chunks(f, iter_ndjson(user_id))
+                click.echo(f"✓ Exportado en {output}", err=True)
+            return
+
+        # CSV: un fichero por tabla
+        directory = '.' if output == '-' else output
+        os.makedirs(directory, exist_ok=True)
+        for table in EXPORT_TABLES:
+            path = os.path.join(directory, f'{table}.csv')
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                _write_chunks(f, iter_csv(user_id, table))
+            click.echo(f"✓ {path}", err=True)
+
+
+def _write_chunks(stream, chunks):
+    for chunk in chunks:
+        stream.write(chunk)
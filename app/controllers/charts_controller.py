@@ -3,13 +3,25 @@ Controlador de Gráficas y Análisis
 Permite visualizar y correlacionar cualquier métrica en el tiempo
 """
 
-from flask import Blueprint, render_template, session, jsonify, request
+from flask import Blueprint, render_template, session, jsonify, request, current_app
 from datetime import date, datetime, timedelta
-from app.models.database import Database
+import numpy as np
+from app.models.metrics import fetch_metric_series, fetch_metric_columns, RESOLUTIONS
+from app.models.metric_registry import DAILY_METRICS, EXERCISE_METRICS, PALETTE, resolve
+from app.models.workout import Exercise
+from app.models.cache import cached_response, CHART_TABLES
+from app.models.versions import conditional_get
+from app.analytics.downsampling import downsample_points
+from app.analytics.columnar import (
+    COLUMNAR_MIMETYPE, COLUMNAR_JSON_MIMETYPE,
+    points_to_columns, downsample_columns, encode_base64, encode_binary
+)
+from app.analytics.trends import parse_derived_metric, apply_trend, extended_start
+from app.analytics.correlation import correlation_matrix, strongest_pairs, lagged_correlation
+from app.analytics.alignment import GAP_MODES, align_columns, complete_rows, day_strings
 
 charts_bp = Blueprint('charts', __name__)
 
-
 @charts_bp.route('/')
 def index():
     """Vista principal de gráficas."""
@@ -17,236 +29,151 @@ def index():
 
 
 @charts_bp.route('/api/metrics')
+@conditional_get('workout_sessions', 'workout_sets', 'exercises')
 def get_available_metrics():
-    """Devuelve la lista de métricas disponibles para graficar."""
-    # Paleta retro-moderna cálida
-    metrics = [
-        # Nutrición
-        {'id': 'calories', 'name': 'Calorías', 'category': 'Nutrición', 'unit': 'kcal', 'color': '#C67B5C'},  # terracotta
-        {'id': 'protein', 'name': 'Proteína', 'category': 'Nutrición', 'unit': 'g', 'color': '#6B7B8C'},      # slate-blue
-        {'id': 'carbs', 'name': 'Carbohidratos', 'category': 'Nutrición', 'unit': 'g', 'color': '#E8D4A8'},   # soft-yellow
-        {'id': 'fat', 'name': 'Grasas', 'category': 'Nutrición', 'unit': 'g', 'color': '#D4956C'},            # muted-orange
-        {'id': 'water', 'name': 'Agua', 'category': 'Nutrición', 'unit': 'L', 'color': '#8C9DAD'},            # dusty-blue
-        
-        # Medidas corporales
-        {'id': 'weight', 'name': 'Peso', 'category': 'Medidas', 'unit': 'kg', 'color': '#8FA584'},            # sage
-        {'id': 'body_fat', 'name': '% Grasa corporal', 'category': 'Medidas', 'unit': '%', 'color': '#B85C4C'}, # brick
-        {'id': 'chest', 'name': 'Pecho', 'category': 'Medidas', 'unit': 'cm', 'color': '#A5B5C5'},            # soft-blue
-        {'id': 'waist', 'name': 'Cintura', 'category': 'Medidas', 'unit': 'cm', 'color': '#CC8860'},          # warm-orange
-        {'id': 'hips', 'name': 'Cadera', 'category': 'Medidas', 'unit': 'cm', 'color': '#7C8C6C'},            # olive
-        {'id': 'biceps', 'name': 'Bíceps (media)', 'category': 'Medidas', 'unit': 'cm', 'color': '#9E5A4C'},  # rust
-        {'id': 'thighs', 'name': 'Muslos (media)', 'category': 'Medidas', 'unit': 'cm', 'color': '#A85D42'},  # terracotta-dark
-        
-        # Autocuidado
-        {'id': 'sleep_hours', 'name': 'Horas de sueño', 'category': 'Autocuidado', 'unit': 'h', 'color': '#6B7B8C'},   # slate-blue
-        {'id': 'sleep_quality', 'name': 'Calidad de sueño', 'category': 'Autocuidado', 'unit': '/10', 'color': '#8C9DAD'}, # dusty-blue
-        {'id': 'steps', 'name': 'Pasos', 'category': 'Autocuidado', 'unit': 'pasos', 'color': '#8FA584'},     # sage
-        
-        # Entrenamiento
-        {'id': 'workout_volume', 'name': 'Volumen total (peso x reps)', 'category': 'Entrenamiento', 'unit': 'kg', 'color': '#B85C4C'},  # brick
-        {'id': 'workout_sets', 'name': 'Series totales', 'category': 'Entrenamiento', 'unit': 'series', 'color': '#A5B5C5'},  # soft-blue
-        {'id': 'workout_duration', 'name': 'Duración entrenamientos', 'category': 'Entrenamiento', 'unit': 'min', 'color': '#7C8C6C'},  # olive
-    ]
+    """
+    Devuelve la lista de métricas disponibles para graficar:
+    las del registro y las de cada ejercicio que el usuario ha registrado
+    (volumen y 1RM estimado).
+    """
+    user_id = session.get('user_id', 1)
+    metrics = [metric.to_dict() for metric in DAILY_METRICS]
+    exercises = Exercise.get_logged(user_id)
+    for metric in EXERCISE_METRICS:
+        for position, exercise in enumerate(exercises):
+            metrics.append({
+                **metric.to_dict(),
+                'id': f"{metric.id}:{exercise.id}",
+                'name': f"{metric.name}: {exercise.name}",
+                'color': PALETTE[position % len(PALETTE)],
+            })
     return jsonify(metrics)
 
 
 @charts_bp.route('/api/data')
+@conditional_get(*CHART_TABLES)
+@cached_response()
 def get_metric_data():
     """
     Obtiene datos de una o más métricas.
     Query params:
-        - metrics: lista de IDs de métricas separadas por coma
+        - metrics: lista de IDs de métricas separadas por coma; admite tendencias
+          '<métrica>:ma<días>', ':sum<días>' y ':ema<días>' (p. ej. weight:ma7)
         - start_date: fecha inicio (YYYY-MM-DD)
         - end_date: fecha fin (YYYY-MM-DD)
+        - resolution: day (por defecto), week o month; agrupa en SQL
+        - max_points: máximo de puntos por serie (opcional, reducción LTTB)
+        - format: json (por defecto), columnar (base64) o binary; también por cabecera Accept
     """
     user_id = session.get('user_id', 1)
     
     metrics_param = request.args.get('metrics', '')
     start_date = request.args.get('start_date', (date.today() - timedelta(days=30)).isoformat())
     end_date = request.args.get('end_date', date.today().isoformat())
+    resolution = request.args.get('resolution', 'day')
+    max_points = request.args.get('max_points', type=int)
+    if resolution not in RESOLUTIONS:
+        return jsonify({'error': f"resolution debe ser uno de: {', '.join(RESOLUTIONS)}"}), 400
+    if max_points is not None and max_points < 3:
+        return jsonify({'error': 'max_points debe ser al menos 3'}), 400
     
     if not metrics_param:
         return jsonify({'error': 'No metrics specified'}), 400
     
     metric_ids = [m.strip() for m in metrics_param.split(',')]
     
-    result = {}
-    for metric_id in metric_ids:
-        data = get_metric_values(user_id, metric_id, start_date, end_date)
-        result[metric_id] = data
+    response_format = negotiate_format()
+    if response_format != 'json':
+        try:
+            columns = fetch_columns(user_id, metric_ids, start_date, end_date, resolution)
+        except ValueError:
+            return jsonify({'error': 'Fechas no válidas (YYYY-MM-DD)'}), 400
+        columns = {
+            metric_id: downsample_columns(days, values, max_points)
+            for metric_id, (days, values) in columns.items()
+        }
+        if response_format == 'binary':
+            response = current_app.response_class(encode_binary(columns), mimetype=COLUMNAR_MIMETYPE)
+        else:
+            response = jsonify(encode_base64(columns))
+            response.mimetype = COLUMNAR_JSON_MIMETYPE
+        response.vary.add('Accept')
+        return response
+    
+    try:
+        result = fetch_series(user_id, metric_ids, start_date, end_date, resolution)
+    except ValueError:
+        return jsonify({'error': 'Fechas no válidas (YYYY-MM-DD)'}), 400
     
-    return jsonify(result)
+    if max_points is not None:
+        result = {
+            metric_id: downsample_points(points, max_points)
+            for metric_id, points in result.items()
+        }
+    
+    response = jsonify(result)
+    response.vary.add('Accept')
+    return response
 
 
-def get_metric_values(user_id, metric_id, start_date, end_date):
-    """Obtiene los valores de una métrica específica."""
-    
-    queries = {
-        # Nutrición - agregados diarios
-        'calories': """
-            SELECT fl.log_date as date, 
-                   SUM(f.calories * fl.quantity) as value
-            FROM food_logs fl
-            JOIN foods f ON fl.food_id = f.id
-            WHERE fl.user_id = ? AND fl.log_date BETWEEN ? AND ?
-            GROUP BY fl.log_date
-            ORDER BY fl.log_date
-        """,
-        'protein': """
-            SELECT fl.log_date as date,
-                   SUM(f.protein_g * fl.quantity) as value
-            FROM food_logs fl
-            JOIN foods f ON fl.food_id = f.id
-            WHERE fl.user_id = ? AND fl.log_date BETWEEN ? AND ?
-            GROUP BY fl.log_date
-            ORDER BY fl.log_date
-        """,
-        'carbs': """
-            SELECT fl.log_date as date,
-                   SUM(f.carbs_g * fl.quantity) as value
-            FROM food_logs fl
-            JOIN foods f ON fl.food_id = f.id
-            WHERE fl.user_id = ? AND fl.log_date BETWEEN ? AND ?
-            GROUP BY fl.log_date
-            ORDER BY fl.log_date
-        """,
-        'fat': """
-            SELECT fl.log_date as date,
-                   SUM(f.fat_g * fl.quantity) as value
-            FROM food_logs fl
-            JOIN foods f ON fl.food_id = f.id
-            WHERE fl.user_id = ? AND fl.log_date BETWEEN ? AND ?
-            GROUP BY fl.log_date
-            ORDER BY fl.log_date
-        """,
-        'water': """
-            SELECT log_date as date, liters as value
-            FROM water_logs
-            WHERE user_id = ? AND log_date BETWEEN ? AND ?
-            ORDER BY log_date
-        """,
-        
-        # Medidas corporales
-        'weight': """
-            SELECT measurement_date as date, weight_kg as value
-            FROM body_measurements
-            WHERE user_id = ? AND measurement_date BETWEEN ? AND ?
-            AND weight_kg IS NOT NULL
-            ORDER BY measurement_date
-        """,
-        'body_fat': """
-            SELECT measurement_date as date, body_fat_percentage as value
-            FROM body_measurements
-            WHERE user_id = ? AND measurement_date BETWEEN ? AND ?
-            AND body_fat_percentage IS NOT NULL
-            ORDER BY measurement_date
-        """,
-        'chest': """
-            SELECT measurement_date as date, chest_cm as value
-            FROM body_measurements
-            WHERE user_id = ? AND measurement_date BETWEEN ? AND ?
-            AND chest_cm IS NOT NULL
-            ORDER BY measurement_date
-        """,
-        'waist': """
-            SELECT measurement_date as date, waist_cm as value
-            FROM body_measurements
-            WHERE user_id = ? AND measurement_date BETWEEN ? AND ?
-            AND waist_cm IS NOT NULL
-            ORDER BY measurement_date
-        """,
-        'hips': """
-            SELECT measurement_date as date, hips_cm as value
-            FROM body_measurements
-            WHERE user_id = ? AND measurement_date BETWEEN ? AND ?
-            AND hips_cm IS NOT NULL
-            ORDER BY measurement_date
-        """,
-        'biceps': """
-            SELECT measurement_date as date, 
-                   (COALESCE(bicep_left_cm, 0) + COALESCE(bicep_right_cm, 0)) / 2.0 as value
-            FROM body_measurements
-            WHERE user_id = ? AND measurement_date BETWEEN ? AND ?
-            AND (bicep_left_cm IS NOT NULL OR bicep_right_cm IS NOT NULL)
-            ORDER BY measurement_date
-        """,
-        'thighs': """
-            SELECT measurement_date as date,
-                   (COALESCE(thigh_left_cm, 0) + COALESCE(thigh_right_cm, 0)) / 2.0 as value
-            FROM body_measurements
-            WHERE user_id = ? AND measurement_date BETWEEN ? AND ?
-            AND (thigh_left_cm IS NOT NULL OR thigh_right_cm IS NOT NULL)
-            ORDER BY measurement_date
-        """,
-        
-        # Autocuidado
-        'sleep_hours': """
-            SELECT log_date as date, hours_slept as value
-            FROM sleep_logs
-            WHERE user_id = ? AND log_date BETWEEN ? AND ?
-            ORDER BY log_date
-        """,
-        'sleep_quality': """
-            SELECT log_date as date, sleep_quality as value
-            FROM sleep_logs
-            WHERE user_id = ? AND log_date BETWEEN ? AND ?
-            AND sleep_quality IS NOT NULL
-            ORDER BY log_date
-        """,
-        'steps': """
-            SELECT log_date as date, steps as value
-            FROM step_logs
-            WHERE user_id = ? AND log_date BETWEEN ? AND ?
-            ORDER BY log_date
-        """,
-        
-        # Entrenamiento
-        'workout_volume': """
-            SELECT ws.session_date as date,
-                   SUM(wset.weight_kg * wset.reps) as value
-            FROM workout_sessions ws
-            JOIN workout_sets wset ON ws.id = wset.session_id
-            WHERE ws.user_id = ? AND ws.session_date BETWEEN ? AND ?
-            GROUP BY ws.session_date
-            ORDER BY ws.session_date
-        """,
-        'workout_sets': """
-            SELECT ws.session_date as date,
-                   COUNT(wset.id) as value
-            FROM workout_sessions ws
-            JOIN workout_sets wset ON ws.id = wset.session_id
-            WHERE ws.user_id = ? AND ws.session_date BETWEEN ? AND ?
-            GROUP BY ws.session_date
-            ORDER BY ws.session_date
-        """,
-        'workout_duration': """
-            SELECT session_date as date,
-                   (strftime('%s', end_time) - strftime('%s', start_time)) / 60.0 as value
-            FROM workout_sessions
-            WHERE user_id = ? AND session_date BETWEEN ? AND ?
-            AND start_time IS NOT NULL AND end_time IS NOT NULL
-            ORDER BY session_date
-        """,
-    }
+def negotiate_format():
+    """Formato de respuesta de /api/data: parámetro 'format' o cabecera Accept."""
+    requested = request.args.get('format')
+    if requested in ('json', 'columnar', 'binary'):
+        return requested
+    best = request.accept_mimetypes.best_match(
+        ['application/json', COLUMNAR_JSON_MIMETYPE, COLUMNAR_MIMETYPE], default='application/json'
+    )
+    return {COLUMNAR_JSON_MIMETYPE: 'columnar', COLUMNAR_MIMETYPE: 'binary'}.get(best, 'json')
+
+
+def fetch_series(user_id, metric_ids, start_date, end_date, resolution='day'):
+    """
+    Obtiene métricas base y derivadas (tendencias) del rango.
+    Las tendencias se calculan siempre sobre la serie diaria, pedida desde antes del
+    rango para que el primer valor ya incluya la ventana completa.
+    """
+    derived = {}
+    for metric_id in metric_ids:
+        parsed = parse_derived_metric(metric_id)
+        if parsed is not None:
+            derived[metric_id] = parsed
     
-    if metric_id not in queries:
-        return []
+    # Una consulta por tabla de origen, no una por métrica
+    if not derived:
+        return fetch_metric_series(user_id, metric_ids, start_date, end_date, resolution)
     
-    results = Database.execute_query(queries[metric_id], (user_id, start_date, end_date))
+    base_ids = [m for m in metric_ids if m not in derived]
+    trend_bases = {base for base, _, _ in derived.values()}
+    daily_start = extended_start(start_date, derived.values())
+    if resolution == 'day':
+        daily = fetch_metric_series(user_id, sorted(trend_bases.union(base_ids)), daily_start, end_date)
+        result = {m: [p for p in daily[m] if p['date'] >= start_date] for m in base_ids}
+    else:
+        result = fetch_metric_series(user_id, base_ids, start_date, end_date, resolution)
+        daily = fetch_metric_series(user_id, sorted(trend_bases), daily_start, end_date)
     
-    # Formatear resultados
-    formatted = []
-    for row in results:
-        if row['value'] is not None:
-            formatted.append({
-                'date': str(row['date']),
-                'value': round(float(row['value']), 2) if row['value'] else 0
-            })
+    for metric_id, (base, kind, window) in derived.items():
+        trend = apply_trend(daily[base], kind, window)
+        result[metric_id] = [p for p in trend if p['date'] >= start_date]
     
-    return formatted
+    return {metric_id: result[metric_id] for metric_id in metric_ids}
+
+
+def fetch_columns(user_id, metric_ids, start_date, end_date, resolution='day'):
+    """
+    Como fetch_series, en columnas NumPy (días desde 1970-01-01, valores).
+    Las métricas base se leen directamente en columnas; las tendencias se convierten.
+    """
+    if not any(parse_derived_metric(metric_id) for metric_id in metric_ids):
+        return fetch_metric_columns(user_id, metric_ids, start_date, end_date, resolution)
+    series = fetch_series(user_id, metric_ids, start_date, end_date, resolution)
+    return {metric_id: points_to_columns(points) for metric_id, points in series.items()}
 
 
 @charts_bp.route('/api/correlation')
+@conditional_get(*CHART_TABLES)
+@cached_response()
 def calculate_correlation():
     """
     Calcula la correlación de Pearson entre dos métricas.
@@ -265,30 +192,31 @@ def calculate_correlation():
     if not metric1 or not metric2:
         return jsonify({'error': 'Se requieren dos métricas'}), 400
     
-    # Obtener datos de ambas métricas
-    data1 = get_metric_values(user_id, metric1, start_date, end_date)
-    data2 = get_metric_values(user_id, metric2, start_date, end_date)
+    try:
+        gaps, limit = gap_params()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Crear diccionarios por fecha
-    dict1 = {d['date']: d['value'] for d in data1}
-    dict2 = {d['date']: d['value'] for d in data2}
+    # Ambas métricas alineadas sobre el calendario del rango
+    try:
+        columns = fetch_columns(user_id, [metric1, metric2], start_date, end_date)
+        days, values = align_columns(columns, [metric1, metric2], start_date, end_date, gaps, limit)
+    except ValueError:
+        return jsonify({'error': 'Fechas no válidas (YYYY-MM-DD)'}), 400
     
-    # Encontrar fechas comunes
-    common_dates = set(dict1.keys()) & set(dict2.keys())
+    # Fechas en las que las dos tienen dato
+    days, values = complete_rows(days, values)
     
-    if len(common_dates) < 3:
+    if len(days) < 3:
         return jsonify({
             'correlation': None,
             'message': 'No hay suficientes datos coincidentes para calcular correlación (mínimo 3 puntos)',
-            'common_points': len(common_dates)
+            'common_points': len(days)
         })
     
-    # Extraer valores para fechas comunes
-    values1 = [dict1[d] for d in sorted(common_dates)]
-    values2 = [dict2[d] for d in sorted(common_dates)]
-    
-    # Calcular correlación de Pearson
-    correlation = pearson_correlation(values1, values2)
+    # Calcular correlación de Pearson (varianza nula: sin relación)
+    corr, _ = correlation_matrix(values)
+    correlation = 0.0 if np.isnan(corr[0, 1]) else float(corr[0, 1])
     
     # Interpretar la correlación
     interpretation = interpret_correlation(correlation)
@@ -296,41 +224,154 @@ def calculate_correlation():
     return jsonify({
         'correlation': round(correlation, 4),
         'interpretation': interpretation,
-        'common_points': len(common_dates),
+        'common_points': len(days),
+        'gaps': gaps,
         'scatter_data': [
-            {'x': v1, 'y': v2, 'date': d} 
-            for d, v1, v2 in zip(sorted(common_dates), values1, values2)
+            {'x': round(float(v1), 2), 'y': round(float(v2), 2), 'date': d}
+            for d, (v1, v2) in zip(day_strings(days), values)
         ]
     })
 
 
-def pearson_correlation(x, y):
-    """Calcula el coeficiente de correlación de Pearson."""
-    n = len(x)
-    if n == 0:
-        return 0
+def gap_params():
+    """
+    Modo de alineación de las peticiones de correlación.
+    Query params:
+        - gaps: drop (por defecto), ffill, linear o weekly
+        - max_gap: días máximos a rellenar con ffill o linear (opcional)
+    """
+    gaps = request.args.get('gaps', 'drop')
+    limit = request.args.get('max_gap', type=int)
+    if gaps not in GAP_MODES:
+        raise ValueError(f"gaps debe ser uno de: {', '.join(GAP_MODES)}")
+    if limit is not None and limit < 0:
+        raise ValueError('max_gap no puede ser negativo')
+    return gaps, limit
+
+
+@charts_bp.route('/api/correlation-matrix')
+@conditional_get(*CHART_TABLES)
+@cached_response()
+def calculate_correlation_matrix():
+    """
+    Calcula la correlación de Pearson de todas las parejas de métricas en una sola llamada.
+    Query params:
+        - metrics: IDs separados por coma (opcional, por defecto todas)
+        - start_date, end_date: rango de fechas
+        - min_points: puntos comunes mínimos por pareja (por defecto 3)
+        - gaps, max_gap: alineación de las series (ver gap_params)
+    """
+    user_id = session.get('user_id', 1)
     
-    # Medias
-    mean_x = sum(x) / n
-    mean_y = sum(y) / n
+    all_ids = [metric.id for metric in DAILY_METRICS]
+    metrics_param = request.args.get('metrics', '')
+    if metrics_param:
+        requested = list(dict.fromkeys(m.strip() for m in metrics_param.split(',')))
+        # Primero las métricas diarias en el orden del registro, después las de ejercicio
+        metric_ids = [m for m in all_ids if m in requested]
+        metric_ids += [m for m in requested if m not in all_ids and resolve(m) is not None]
+    else:
+        metric_ids = all_ids
+    start_date = request.args.get('start_date', (date.today() - timedelta(days=90)).isoformat())
+    end_date = request.args.get('end_date', date.today().isoformat())
+    min_points = max(request.args.get('min_points', 3, type=int), 2)
     
-    # Desviaciones
-    dev_x = [xi - mean_x for xi in x]
-    dev_y = [yi - mean_y for yi in y]
+    if len(metric_ids) < 2:
+        return jsonify({'error': 'Se requieren al menos dos métricas'}), 400
     
-    # Suma de productos de desviaciones
-    sum_dev_xy = sum(dx * dy for dx, dy in zip(dev_x, dev_y))
+    try:
+        gaps, limit = gap_params()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        columns = fetch_metric_columns(user_id, metric_ids, start_date, end_date)
+        _, values = align_columns(columns, metric_ids, start_date, end_date, gaps, limit)
+    except ValueError:
+        return jsonify({'error': 'Fechas no válidas (YYYY-MM-DD)'}), 400
+    corr, counts = correlation_matrix(values, min_points)
     
-    # Suma de cuadrados de desviaciones
-    sum_dev_x2 = sum(dx ** 2 for dx in dev_x)
-    sum_dev_y2 = sum(dy ** 2 for dy in dev_y)
+    return jsonify({
+        'metrics': metric_ids,
+        'matrix': [
+            [None if r != r else round(float(r), 4) for r in row]
+            for row in corr
+        ],
+        'common_points': counts.tolist(),
+        'gaps': gaps,
+        'strongest': strongest_pairs(metric_ids, corr, counts),
+    })
+
+
+@charts_bp.route('/api/correlation/lags')
+@conditional_get(*CHART_TABLES)
+@cached_response()
+def calculate_lagged_correlation():
+    """
+    Calcula la correlación entre metric1 en el día t y metric2 en el día t + lag
+    para cada lag en [-max_lag, max_lag] (lag > 0: metric1 va por delante).
+    Query params:
+        - metric1, metric2: IDs de las métricas
+        - start_date, end_date: rango de fechas de metric1
+        - max_lag: desfase máximo en días (por defecto 14, máximo 90)
+        - gaps, max_gap: alineación de las series (ver gap_params); weekly no aplica,
+          los desfases se miden en días
+    """
+    user_id = session.get('user_id', 1)
     
-    # Evitar división por cero
-    denominator = (sum_dev_x2 * sum_dev_y2) ** 0.5
-    if denominator == 0:
-        return 0
+    metric1 = request.args.get('metric1')
+    metric2 = request.args.get('metric2')
+    start_date = request.args.get('start_date', (date.today() - timedelta(days=90)).isoformat())
+    end_date = request.args.get('end_date', date.today().isoformat())
+    max_lag = min(max(request.args.get('max_lag', 14, type=int), 0), 90)
+    
+    if not metric1 or not metric2:
+        return jsonify({'error': 'Se requieren dos métricas'}), 400
+    
+    try:
+        gaps, limit = gap_params()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if gaps == 'weekly':
+        return jsonify({'error': 'gaps=weekly no está disponible para desfases en días'}), 400
     
-    return sum_dev_xy / denominator
+    try:
+        start = date.fromisoformat(start_date)
+        end = date.fromisoformat(end_date)
+    except ValueError:
+        return jsonify({'error': 'Fechas no válidas (YYYY-MM-DD)'}), 400
+    if end < start:
+        return jsonify({'error': 'La fecha de fin es anterior a la de inicio'}), 400
+    
+    # metric2 se pide ampliada max_lag días por cada lado para cubrir todos los desfases
+    lag_start = start - timedelta(days=max_lag)
+    lag_end = end + timedelta(days=max_lag)
+    data1 = fetch_columns(user_id, [metric1], start.isoformat(), end.isoformat())
+    data2 = fetch_columns(user_id, [metric2], lag_start.isoformat(), lag_end.isoformat())
+    
+    _, x = align_columns(data1, [metric1], start, end, gaps, limit)
+    _, y = align_columns(data2, [metric2], lag_start, lag_end, gaps, limit)
+    lags, corr, counts = lagged_correlation(x[:, 0], y[:, 0], max_lag)
+    
+    profile = [
+        {
+            'lag': int(lag),
+            'correlation': None if r != r else round(float(r), 4),
+            'common_points': int(n),
+        }
+        for lag, r, n in zip(lags, corr, counts)
+    ]
+    valid = [p for p in profile if p['correlation'] is not None]
+    best = max(valid, key=lambda p: (abs(p['correlation']), -abs(p['lag'])), default=None)
+    if best is not None:
+        best = dict(best, interpretation=interpret_correlation(best['correlation']))
+    
+    return jsonify({
+        'metric1': metric1,
+        'metric2': metric2,
+        'gaps': gaps,
+        'lags': profile,
+        'best': best,
+    })
 
 
 def interpret_correlation(r):
@@ -0,0 +1,49 @@
+"""
+Controlador de Exportación
+Descarga del historial completo en NDJSON o CSV, enviado por bloques
+"""
+
+from flask import Blueprint, request, session, jsonify, Response, stream_with_context
+from datetime import date
+from app.models.export import EXPORT_TABLES, iter_ndjson, iter_csv
+
+export_bp = Blueprint('export', __name__)
+
+
+@export_bp.route('/api/data')
+def api_export():
+    """
+    API: Exportar los datos del usuario.
+    Query params:
+        - format: ndjson (por defecto) o csv
+        - tables: tablas separadas por coma (ndjson; por defecto todas)
+        - table: tabla a exportar (csv, obligatoria)
+    """
+    user_id = session['user_id']
+    export_format = request.args.get('format', 'ndjson')
+    today = date.today().isoformat()
+    
+    if export_format == 'csv':
+        table = request.args.get('table')
+        if table not in EXPORT_TABLES:
+            return jsonify({'error': f"table debe ser uno de: {', '.join(EXPORT_TABLES)}"}), 400
+        body = iter_csv(user_id, table)
+        mimetype = 'text/csv'
+        filename = f'gymgraph-{table}-{today}.csv'
+    elif export_format == 'ndjson':
+        tables_param = request.args.get('tables', '')
+        tables = [t.strip() for t in tables_param.split(',') if t.strip()] or list(EXPORT_TABLES)
+        unknown = [t for t in tables if t not in EXPORT_TABLES]
+        if unknown:
+            return jsonify({'error': f"Tablas desconocidas: {', '.join(unknown)}"}), 400
+        body = iter_ndjson(user_id, tables)
+        mimetype = 'application/x-ndjson'
+        filename = f'gymgraph-export-{today}.ndjson'
+    else:
+        return jsonify({'error': 'format debe ser ndjson o csv'}), 400
+    
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
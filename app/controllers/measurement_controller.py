@@ -6,6 +6,7 @@ from flask import Blueprint, request, render_template, session, jsonify
 from datetime import date
 # Sin autenticación - aplicación local
 from app.models.measurements import BodyMeasurement
+from app.models.versions import conditional_get
 
 measurement_bp = Blueprint('measurement', __name__)
 
@@ -66,6 +67,7 @@ def new_measurement():
 # ============================================
 
 @measurement_bp.route('/api/measurements')
+@conditional_get('body_measurements')
 
 def api_measurements():
     """API: Obtener historial de medidas."""
@@ -107,6 +109,7 @@ def api_add_measurement():
 
 
 @measurement_bp.route('/api/weight-history')
+@conditional_get('body_measurements')
 
 def api_weight_history():
     """API: Historial de peso para gráficas."""
@@ -118,6 +121,7 @@ def api_weight_history():
 
 
 @measurement_bp.route('/api/latest')
+@conditional_get('body_measurements')
 
 def api_latest():
     """API: Últimas medidas."""
@@ -6,6 +6,7 @@ from flask import Blueprint, request, render_template, redirect, url_for, sessio
 from datetime import date
 # Sin autenticación - aplicación local
 from app.models.nutrition import Food, NutritionGoal, FoodLog, WaterLog
+from app.models.versions import conditional_get
 
 nutrition_bp = Blueprint('nutrition', __name__)
 
@@ -101,6 +102,7 @@ def goals():
 # ============================================
 
 @nutrition_bp.route('/api/foods')
+@conditional_get('foods')
 
 def api_foods():
     """API: Buscar alimentos."""
@@ -170,6 +172,7 @@ def api_delete_food_log(log_id):
 
 
 @nutrition_bp.route('/api/logs/<string:log_date>')
+@conditional_get('food_logs', 'foods')
 
 def api_get_logs(log_date):
     """API: Obtener registros de un día."""
@@ -198,6 +201,7 @@ def api_add_water():
 
 
 @nutrition_bp.route('/api/water/<string:log_date>')
+@conditional_get('water_logs')
 
 def api_get_water(log_date):
     """API: Obtener agua del día."""
@@ -210,6 +214,7 @@ def api_get_water(log_date):
 
 
 @nutrition_bp.route('/api/goals')
+@conditional_get('nutrition_goals')
 
 def api_get_goals():
     """API: Obtener objetivos."""
@@ -222,6 +227,7 @@ def api_get_goals():
 
 
 @nutrition_bp.route('/api/calories-history')
+@conditional_get('food_logs', 'foods')
 
 def api_calories_history():
     """API: Obtener historial de calorías (últimos días)."""
@@ -6,6 +6,7 @@ from flask import Blueprint, request, render_template, session, jsonify, flash,
 from datetime import date
 # Sin autenticación - aplicación local
 from app.models.measurements import SleepLog, MenstrualLog, StepLog
+from app.models.versions import conditional_get
 
 selfcare_bp = Blueprint('selfcare', __name__)
 
@@ -133,6 +134,7 @@ def api_add_sleep():
 
 
 @selfcare_bp.route('/api/sleep')
+@conditional_get('sleep_logs')
 
 def api_get_sleep():
     """API: Obtener historial de sueño."""
@@ -161,6 +163,7 @@ def api_add_steps():
 
 
 @selfcare_bp.route('/api/steps')
+@conditional_get('step_logs')
 
 def api_get_steps():
     """API: Obtener historial de pasos."""
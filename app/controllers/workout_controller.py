@@ -4,14 +4,28 @@ Controlador de Entrenamiento
 
 from flask import Blueprint, request, render_template, redirect, url_for, session, flash, jsonify
 from datetime import date, datetime
+import numpy as np
 # Sin autenticación - aplicación local
 from app.models.workout import (
     Exercise, TrainingPlan, TrainingDay, 
     PlannedExercise, WorkoutSession, WorkoutSet
 )
+from app.models.records import PersonalRecord
+from app.models.metrics import fetch_set_columns
+from app.analytics.strength import DEFAULT_FORMULA, FORMULAS, session_summary, split_by_exercise
+from app.analytics.alignment import day_strings
+from app.models.sync import SyncOperation
+from app.models.pagination import CursorError, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.models.versions import conditional_get
 
 workout_bp = Blueprint('workout', __name__)
 
+# Máximo de series en una petición de /sets/batch
+MAX_BATCH_SETS = 500
+
+# Máximo de operaciones en una petición de /sync
+MAX_SYNC_OPERATIONS = 1000
+
 
 # ============================================
 # VISTAS HTML
@@ -70,8 +84,13 @@ def workout_session():
 def history():
     """Historial de entrenamientos."""
     user_id = session['user_id']
-    sessions = WorkoutSession.get_by_user(user_id, limit=20)
-    return render_template('workout/history.html', sessions=sessions)
+    cursor = request.args.get('cursor')
+    try:
+        sessions, next_cursor = WorkoutSession.get_by_user(user_id, DEFAULT_PAGE_SIZE, cursor)
+    except CursorError:
+        return redirect(url_for('workout.history'))
+    return render_template('workout/history.html', sessions=sessions,
+                           next_cursor=next_cursor, paginated=bool(cursor))
 
 
 # ============================================
@@ -79,6 +98,7 @@ def history():
 # ============================================
 
 @workout_bp.route('/api/exercises')
+@conditional_get('exercises')
 
 def api_exercises():
     """API: Obtener ejercicios."""
@@ -114,25 +134,24 @@ def api_create_exercise():
 
 
 @workout_bp.route('/api/plans')
+@conditional_get('training_plans', 'training_days', 'planned_exercises', 'exercises')
 
 def api_plans():
     """API: Obtener planes."""
     user_id = session['user_id']
-    plans = TrainingPlan.get_by_user(user_id)
+    plans = TrainingPlan.load_tree(user_id)
     return jsonify([p.to_dict() for p in plans])
 
 
 @workout_bp.route('/api/plans/<int:plan_id>')
+@conditional_get('training_plans', 'training_days', 'planned_exercises', 'exercises')
 
 def api_plan_detail(plan_id):
     """API: Obtener detalle de un plan."""
-    query = "SELECT * FROM training_plans WHERE id = %s"
-    from app.models.database import Database
-    result = Database.execute_query(query, (plan_id,), fetch_one=True)
+    plans = TrainingPlan.load_tree(session['user_id'], plan_id)
     
-    if result and result['user_id'] == session['user_id']:
-        plan = TrainingPlan(**result)
-        return jsonify(plan.to_dict())
+    if plans:
+        return jsonify(plans[0].to_dict())
     
     return jsonify({'error': 'Plan no encontrado'}), 404
 
@@ -194,45 +213,253 @@ def api_start_session():
 
 def api_add_set(session_id):
     """API: Registrar serie."""
-    data = request.json
-    
-    workout_set = WorkoutSet(
-        session_id=session_id,
-        exercise_id=data['exercise_id'],
-        set_number=data['set_number'],
-        weight_kg=data.get('weight_kg'),
-        reps=data.get('reps'),
-        rpe=data.get('rpe'),
-        is_warmup=data.get('is_warmup', False),
-        notes=data.get('notes')
-    )
+    if WorkoutSession.get_for_user(session_id, session['user_id']) is None:
+        return jsonify({'error': 'Sesión no encontrada'}), 404
+    try:
+        workout_set = WorkoutSet.from_dict(session_id, request.json)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not Exercise.existing_ids([workout_set.exercise_id]):
+        return jsonify({'error': f'Ejercicio {workout_set.exercise_id} no encontrado'}), 400
     workout_set.save()
     
-    return jsonify(workout_set.to_dict()), 201
+    return jsonify(dict(workout_set.to_dict(), new_records=workout_set.new_records)), 201
+
+
+@workout_bp.route('/api/sessions/<int:session_id>/sets/batch', methods=['POST'])
+
+def api_add_sets(session_id):
+    """
+    API: Registrar varias series (de uno o varios ejercicios) en una sola transacción.
+    Body: {"sets": [{exercise_id, set_number, weight_kg, reps, rpe, is_warmup, notes}, ...]}
+    """
+    if WorkoutSession.get_for_user(session_id, session['user_id']) is None:
+        return jsonify({'error': 'Sesión no encontrada'}), 404
+    data = request.json or {}
+    items = data.get('sets')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Se requiere una lista de series en "sets"'}), 400
+    if len(items) > MAX_BATCH_SETS:
+        return jsonify({'error': f'Máximo {MAX_BATCH_SETS} series por petición'}), 400
+    sets = []
+    for index, item in enumerate(items):
+        try:
+            sets.append(WorkoutSet.from_dict(session_id, item))
+        except ValueError as e:
+            return jsonify({'error': f'Serie {index}: {e}'}), 400
+    # Todos los ejercicios deben existir: el lote se guarda entero o no se guarda
+    known = Exercise.existing_ids(s.exercise_id for s in sets)
+    for index, workout_set in enumerate(sets):
+        if workout_set.exercise_id not in known:
+            return jsonify({'error': f'Serie {index}: ejercicio {workout_set.exercise_id} no encontrado'}), 400
+    
+    WorkoutSet.save_many(sets)
+    
+    return jsonify({
+        'ids': [workout_set.id for workout_set in sets],
+        'sets': [workout_set.to_dict() for workout_set in sets],
+        'new_records': [record for workout_set in sets for record in workout_set.new_records],
+    }), 201
 
 
 @workout_bp.route('/api/sessions/<int:session_id>/end', methods=['POST'])
 
 def api_end_session(session_id):
     """API: Finalizar sesión."""
-    from app.models.database import Database
-    
-    query = "UPDATE workout_sessions SET end_time = %s WHERE id = %s"
-    Database.execute_update(query, (datetime.now().time(), session_id))
+    if WorkoutSession.get_for_user(session_id, session['user_id']) is None:
+        return jsonify({'error': 'Sesión no encontrada'}), 404
+    WorkoutSession.end(session_id)
     
     return jsonify({'message': 'Sesión finalizada'})
 
 
+@workout_bp.route('/api/sync', methods=['POST'])
+
+def api_sync():
+    """
+    API: Aplica las operaciones guardadas sin conexión en una sola transacción.
+    Body: {"operations": [{key, type: start_session | add_set | end_session, ...}, ...]}
+    Reenviar una clave ya aplicada no repite la escritura (status "duplicate").
+    """
+    data = request.json or {}
+    operations = data.get('operations')
+    if not isinstance(operations, list):
+        return jsonify({'error': 'Se requiere una lista de operaciones en "operations"'}), 400
+    if len(operations) > MAX_SYNC_OPERATIONS:
+        return jsonify({'error': f'Máximo {MAX_SYNC_OPERATIONS} operaciones por petición'}), 400
+    
+    results = SyncOperation.apply(session['user_id'], operations)
+    
+    return jsonify({'results': results})
+
+
 @workout_bp.route('/api/exercises/<int:exercise_id>/history')
+@conditional_get('workout_sets', 'workout_sessions', 'exercises')
 
 def api_exercise_history(exercise_id):
-    """API: Historial de un ejercicio."""
+    """
+    API: Historial de un ejercicio (series de la más reciente a la más antigua).
+    Query params: limit, cursor (next_cursor de la página anterior).
+    Sin limit ni cursor responde como antes: la lista de las últimas series, con el
+    cursor de la página siguiente en la cabecera X-Next-Cursor.
+    """
+    user_id = session['user_id']
+    paginated = 'limit' in request.args or 'cursor' in request.args
+    limit, error = _page_size()
+    if error:
+        return error
+    try:
+        history, next_cursor = WorkoutSet.get_exercise_history(
+            user_id, exercise_id, limit, request.args.get('cursor'))
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
+    if paginated:
+        return jsonify({'sets': history, 'next_cursor': next_cursor})
+    response = jsonify(history)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+
+@workout_bp.route('/api/records')
+@conditional_get('personal_records', 'exercises')
+
+def api_records():
+    """API: Récords personales de todos los ejercicios."""
+    user_id = session['user_id']
+    return jsonify(PersonalRecord.get_by_user(user_id))
+
+
+@workout_bp.route('/api/exercises/<int:exercise_id>/records')
+@conditional_get('personal_records')
+
+def api_exercise_records(exercise_id):
+    """API: Récords personales de un ejercicio (incluye repeticiones máximas por peso)."""
+    user_id = session['user_id']
+    records = PersonalRecord.get_by_exercise(user_id, exercise_id)
+    return jsonify([record.to_dict() for record in records])
+
+
+@workout_bp.route('/api/progression')
+@conditional_get('workout_sets', 'workout_sessions', 'exercises')
+
+def api_progression():
+    """
+    API: Progresión de fuerza de todos los ejercicios (1RM estimado por sesión).
+    Query params: formula (epley | brzycki), rpe (1 = ajustar por RPE, por defecto)
+    """
+    user_id = session['user_id']
+    summary, error = _progression_summary(user_id)
+    if error:
+        return error
+    names = {exercise.id: exercise.name for exercise in Exercise.get_logged(user_id)}
+    
+    result = []
+    for exercise_id, sessions in split_by_exercise(summary).items():
+        e1rm = sessions['e1rm']
+        known = np.flatnonzero(~np.isnan(e1rm))
+        if len(known) == 0:
+            continue
+        first, last = e1rm[known[0]], e1rm[known[-1]]
+        best = known[np.argmax(e1rm[known])]
+        result.append({
+            'exercise_id': exercise_id,
+            'exercise_name': names.get(exercise_id),
+            'sessions': int(len(e1rm)),
+            'first_e1rm': round(float(first), 2),
+            'last_e1rm': round(float(last), 2),
+            'best_e1rm': round(float(e1rm[best]), 2),
+            'best_date': day_strings([sessions['day'][best]])[0],
+            'last_date': day_strings([sessions['day'][-1]])[0],
+            'change_pct': round(float((last - first) / first * 100), 1),
+            'total_volume': round(float(sessions['volume'].sum()), 2),
+        })
+    result.sort(key=lambda item: item['exercise_name'] or '')
+    return jsonify(result)
+
+
+@workout_bp.route('/api/exercises/<int:exercise_id>/progression')
+@conditional_get('workout_sets', 'workout_sessions')
+
+def api_exercise_progression(exercise_id):
+    """
+    API: 1RM estimado, mejor serie y volumen de cada sesión de un ejercicio.
+    Query params: formula (epley | brzycki), rpe (1 = ajustar por RPE, por defecto)
+    """
+    user_id = session['user_id']
+    summary, error = _progression_summary(user_id, exercise_id)
+    if error:
+        return error
+    
+    return jsonify([
+        {
+            'date': date_string,
+            'session_id': int(session_id),
+            'e1rm': None if np.isnan(e1rm) else round(float(e1rm), 2),
+            'best_set': {
+                'weight_kg': None if np.isnan(weight) else float(weight),
+                'reps': None if np.isnan(reps) else int(reps),
+                'rpe': None if np.isnan(rpe) else float(rpe),
+            },
+            'volume': round(float(volume), 2),
+            'sets': int(sets),
+        }
+        for date_string, session_id, e1rm, weight, reps, rpe, volume, sets in zip(
+            day_strings(summary['day']), summary['session_id'], summary['e1rm'],
+            summary['best_weight'], summary['best_reps'], summary['best_rpe'],
+            summary['volume'], summary['sets']
+        )
+    ])
+
+
+def _progression_summary(user_id, exercise_id=None):
+    """Resumen por sesión de las series del usuario; (None, respuesta 400) si los parámetros no valen."""
+    formula = request.args.get('formula', DEFAULT_FORMULA)
+    if formula not in FORMULAS:
+        return None, (jsonify({'error': f"formula debe ser una de: {', '.join(FORMULAS)}"}), 400)
+    use_rpe = request.args.get('rpe', '1') != '0'
+    
+    columns = fetch_set_columns(user_id, exercise_id)
+    summary = session_summary(
+        columns['exercise_id'], columns['session_id'], columns['day'],
+        columns['weight'], columns['reps'], columns['rpe'] if use_rpe else None, formula
+    )
+    return summary, None
+
+
+@workout_bp.route('/api/sessions')
+@conditional_get('workout_sessions')
+
+def api_sessions():
+    """
+    API: Historial de sesiones (de la más reciente a la más antigua).
+    Query params: limit, cursor (next_cursor de la página anterior)
+    """
     user_id = session['user_id']
-    history = WorkoutSet.get_exercise_history(user_id, exercise_id)
-    return jsonify(history)
+    limit, error = _page_size()
+    if error:
+        return error
+    try:
+        sessions, next_cursor = WorkoutSession.get_by_user(user_id, limit, request.args.get('cursor'))
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'sessions': [s.to_dict() for s in sessions], 'next_cursor': next_cursor})
+
+
+def _page_size():
+    """Parámetro limit de los listados paginados; (None, respuesta 400) si no vale."""
+    error = (jsonify({'error': f'limit debe ser un entero entre 1 y {MAX_PAGE_SIZE}'}), 400)
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return None, error
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return None, error
+    return limit, None
 
 
 @workout_bp.route('/api/sessions/latest')
+@conditional_get('workout_sessions', 'workout_sets')
 
 def api_latest_session():
     """API: Último entrenamiento."""
@@ -0,0 +1,158 @@
+"""
+Caché en memoria de respuestas de las gráficas
+LRU acotada por usuario; se invalida cuando se confirma una escritura en las tablas de origen
+(de este proceso, por los write listeners, o de otro, por Database.external_version)
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from flask import has_request_context, session, request, current_app
+
+
+# Tablas de las que dependen las respuestas de /charts/api/*
+CHART_TABLES = frozenset({
+    'food_logs', 'foods', 'water_logs',
+    'body_measurements', 'sleep_logs', 'step_logs',
+    'workout_sessions', 'workout_sets',
+    'daily_metrics',
+})
+
+
+class ResponseCache:
+    """
+    Caché LRU de respuestas serializadas.
+    Las claves empiezan siempre por el usuario: (user_id, ...).
+    """
+
+    def __init__(self, max_entries=256, tables=CHART_TABLES):
+        self.max_entries = max_entries
+        self.tables = frozenset(tables)
+        self._entries = OrderedDict()
+        self._epoch = 0         # invalidaciones globales
+        self._generations = {}  # user_id -> invalidaciones de ese usuario
+        self._database = None
+        self._external = 0      # última Database.external_version() vista
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app, database):
+        """Lee el tamaño de la configuración y se suscribe a las escrituras."""
+        self.max_entries = app.config.get('CHART_CACHE_SIZE', self.max_entries)
+        self._database = database
+        self._external = database.external_version()
+        database.add_write_listener(self.on_write)
+
+    def get(self, key):
+        """Devuelve (valor, generación). El valor es None si no está en caché."""
+        self._check_external()
+        with self._lock:
+            generation = self._generation(key[0])
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return value, generation
+
+    def set(self, key, value, generation):
+        """
+        Guarda un valor calculado en la generación indicada.
+        Si hubo una escritura mientras se calculaba, se descarta (podría estar obsoleto).
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if self._generation(key[0]) != generation:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _generation(self, user_id):
+        return self._epoch, self._generations.get(user_id, 0)
+
+    def invalidate(self, user_id=None):
+        """Elimina las entradas de un usuario (o todas)."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+                self._epoch += 1
+                return
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def _check_external(self):
+        """Vacía la caché si otro proceso (CLI, scripts) ha escrito en la base de datos."""
+        if self._database is None:
+            return
+        version = self._database.external_version()
+        if version != self._external:
+            self._external = version
+            self.invalidate()
+
+    def on_write(self, tables):
+        """Listener de Database: invalida si se ha escrito en alguna tabla de origen."""
+        if not tables & self.tables:
+            return
+        # Cada usuario escribe sus propios datos; fuera de una petición se invalida todo
+        user_id = session.get('user_id') if has_request_context() else None
+        self.invalidate(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Aciertos, fallos y tamaño actual."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': len(self._entries), 'max_entries': self.max_entries}
+
+
+chart_cache = ResponseCache()
+
+
+def _request_key():
+    """Clave de la petición: usuario, endpoint, día actual y parámetros normalizados."""
+    args = []
+    for name, value in sorted(request.args.items(multi=True)):
+        if name == 'metrics':
+            # El orden de las métricas no cambia la respuesta
+            value = ','.join(sorted({m.strip() for m in value.split(',')}))
+        args.append((name, value))
+    # Las fechas por defecto dependen del día actual; Accept elige el formato de respuesta
+    return (session.get('user_id', 1), request.endpoint, date.today().isoformat(), tuple(args),
+            request.headers.get('Accept', ''))
+
+
+def cached_response(cache=chart_cache):
+    """Decorador para vistas GET que devuelven JSON: sirve desde caché las respuestas 200."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = _request_key()
+            cached, generation = cache.get(key)
+            if cached is not None:
+                body, mimetype, vary = cached
+                response = current_app.response_class(body, mimetype=mimetype)
+                if vary:
+                    response.headers['Vary'] = vary
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                cache.set(key, (response.get_data(), response.mimetype, response.headers.get('Vary')),
+                          generation)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
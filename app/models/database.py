@@ -5,6 +5,27 @@ Versión simplificada para aplicación de escritorio local
 
 import sqlite3
 import os
+import re
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from flask import g, has_app_context
+from app.models.pool import ConnectionPool
+from app.models.dialect import QueryTranslator
+from app.models.storage import StorageProfile
+from app.models.migrations import run_migrations
+from app.models.instrumentation import QueryCollector, log_slow_query, slow_query_logger
+
+logger = logging.getLogger(__name__)
+
+# Tabla afectada por una sentencia de escritura (ya traducida a SQLite)
+_WRITE_TABLE_RE = re.compile(
+    r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)'
+    r'\s+["`\[]?(\w+)',
+    re.IGNORECASE
+)
 
 
 class Database:
@@ -12,6 +33,38 @@ class Database:
     
     _db_path = None
     _initialized = False
+    _pool = None
+    _pool_size = 10
+    _pool_timeout = 10.0
+    _translator = QueryTranslator()
+    _profile = StorageProfile.get('wal')
+    _writer_connection = None
+    _write_lock = threading.RLock()
+    _local = threading.local()  # Transacción en curso del hilo actual
+    _slow_query_ms = 100.0
+    _write_listeners = []
+    _data_version = None     # último PRAGMA data_version visto por el escritor
+    _external_version = 0    # commits de otros procesos detectados
+    
+    @classmethod
+    def init_app(cls, app):
+        """Configura el pool y devuelve la conexión al terminar cada petición."""
+        cls._pool_size = app.config.get('DB_POOL_SIZE', cls._pool_size)
+        cls._pool_timeout = app.config.get('DB_POOL_TIMEOUT', cls._pool_timeout)
+        cls._profile = StorageProfile.from_config(app.config)
+        app.teardown_appcontext(cls.release_connection)
+        
+        # Instrumentación: cabeceras por petición y log de consultas lentas
+        cls._slow_query_ms = app.config.get('DB_SLOW_QUERY_MS', cls._slow_query_ms)
+        slow_log_path = app.config.get('DB_SLOW_QUERY_LOG')
+        if slow_log_path:
+            handler = logging.FileHandler(slow_log_path, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            slow_query_logger.addHandler(handler)
+        app.after_request(cls._add_query_headers)
+        
+        # Esquema y migraciones una sola vez, al arrancar
+        cls.init_db()
     
     @classmethod
     def get_db_path(cls):
@@ -24,13 +77,203 @@ class Database:
         return cls._db_path
     
     @classmethod
-    def get_connection(cls):
-        """Obtiene una conexión a SQLite."""
-        conn = sqlite3.connect(cls.get_db_path())
+    def get_connection(cls, read_only=False):
+        """Abre una conexión nueva a SQLite."""
+        # Las conexiones pueden usarse desde distintos hilos (nunca a la vez)
+        if read_only:
+            uri = Path(cls.get_db_path()).resolve().as_uri() + '?mode=ro'
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(cls.get_db_path(), check_same_thread=False)
         conn.row_factory = sqlite3.Row  # Para acceder a columnas por nombre
         conn.execute("PRAGMA foreign_keys = ON")  # Habilitar foreign keys
+        cls._profile.apply(conn, writer=not read_only)
         return conn
     
+    @classmethod
+    def _open_reader(cls):
+        """Abre una conexión de lectura (solo lectura en modo WAL)."""
+        return cls.get_connection(read_only=cls._profile.is_wal)
+    
+    @classmethod
+    def get_pool(cls):
+        """Obtiene el pool de conexiones de lectura (se crea la primera vez)."""
+        if cls._pool is None:
+            cls._pool = ConnectionPool(cls._open_reader, cls._pool_size, cls._pool_timeout)
+        return cls._pool
+    
+    @classmethod
+    @contextmanager
+    def connection(cls):
+        """
+        Conexión de lectura a usar para una consulta.
+        Dentro de una petición Flask se reutiliza la misma conexión hasta el teardown;
+        fuera de ella se presta una del pool solo durante la consulta.
+        Dentro de una transacción se usa la conexión del escritor para ver sus cambios.
+        """
+        tx_connection = getattr(cls._local, 'connection', None)
+        if tx_connection is not None:
+            yield tx_connection
+        elif has_app_context():
+            if '_db_connection' not in g:
+                g._db_connection = cls.get_pool().acquire()
+            yield g._db_connection
+        else:
+            pool = cls.get_pool()
+            connection = pool.acquire()
+            try:
+                yield connection
+            finally:
+                pool.release(connection)
+    
+    @classmethod
+    @contextmanager
+    def writer(cls):
+        """
+        Conexión única de escritura.
+        Las escrituras se serializan con un cerrojo; en WAL los lectores no esperan.
+        """
+        with cls._write_lock:
+            if cls._writer_connection is None:
+                cls._writer_connection = cls.get_connection()
+            cls._check_data_version()
+            try:
+                yield cls._writer_connection
+            finally:
+                cls._check_data_version()
+    
+    @classmethod
+    def _check_data_version(cls):
+        """Cuenta los commits de otras conexiones (con el cerrojo de escritura tomado)."""
+        version = cls._writer_connection.execute("PRAGMA data_version").fetchone()[0]
+        if cls._data_version is not None and version != cls._data_version:
+            cls._external_version += 1
+        cls._data_version = version
+    
+    @classmethod
+    def external_version(cls):
+        """
+        Cambia cada vez que otro proceso (seed_data.py, comandos flask) confirma escrituras.
+        PRAGMA data_version de la conexión de escritura solo varía con commits de otras
+        conexiones; las escrituras de este proceso avisan con los write listeners.
+        Si hay una escritura en curso no se espera: ya se comprueba al tomar y soltar el cerrojo.
+        """
+        if cls._write_lock.acquire(blocking=False):
+            try:
+                if cls._writer_connection is None:
+                    cls._writer_connection = cls.get_connection()
+                cls._check_data_version()
+            finally:
+                cls._write_lock.release()
+        return cls._external_version
+    
+    @classmethod
+    @contextmanager
+    def transaction(cls):
+        """
+        Agrupa varias escrituras en una única transacción (un solo commit).
+        Las transacciones anidadas se unen a la externa.
+        """
+        tx_connection = getattr(cls._local, 'connection', None)
+        if tx_connection is not None:
+            yield tx_connection
+            return
+        
+        cls.init_db()
+        with cls.writer() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            cls._local.connection = connection
+            cls._local.written_tables = set()
+            try:
+                yield connection
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+            finally:
+                cls._local.connection = None
+                written_tables, cls._local.written_tables = cls._local.written_tables, None
+            # Solo se notifica lo que ha llegado a confirmarse
+            cls._notify_write(written_tables)
+    
+    @classmethod
+    @contextmanager
+    def savepoint(cls, name='savepoint'):
+        """
+        Punto de guardado dentro de la transacción: si el bloque falla se deshacen solo
+        sus escrituras y la transacción sigue abierta.
+        """
+        with cls.transaction() as connection:
+            connection.execute(f"SAVEPOINT {name}")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute(f"ROLLBACK TO {name}")
+                connection.execute(f"RELEASE {name}")
+                raise
+            connection.execute(f"RELEASE {name}")
+    
+    @classmethod
+    def add_write_listener(cls, listener):
+        """
+        Registra una función que recibe el conjunto de tablas modificadas
+        cada vez que se confirma una transacción.
+        """
+        if listener not in cls._write_listeners:
+            cls._write_listeners.append(listener)
+    
+    @classmethod
+    def remove_write_listener(cls, listener):
+        """Elimina una función registrada con add_write_listener."""
+        if listener in cls._write_listeners:
+            cls._write_listeners.remove(listener)
+    
+    @classmethod
+    def mark_written(cls, *tables):
+        """
+        Anota tablas modificadas en la transacción en curso
+        (para escrituras hechas directamente sobre la conexión).
+        """
+        written_tables = getattr(cls._local, 'written_tables', None)
+        if written_tables is not None:
+            written_tables.update(table.lower() for table in tables)
+    
+    @classmethod
+    def _mark_written(cls, query):
+        """Anota la tabla modificada por una sentencia en la transacción en curso."""
+        match = _WRITE_TABLE_RE.match(query)
+        if match:
+            cls.mark_written(match.group(1))
+    
+    @classmethod
+    def _notify_write(cls, tables):
+        """Avisa a los listeners de las tablas modificadas."""
+        if not tables:
+            return
+        for listener in list(cls._write_listeners):
+            try:
+                listener(frozenset(tables))
+            except Exception as e:
+                logger.error("Error en listener de escritura: %s", e)
+    
+    @classmethod
+    def release_connection(cls, exception=None):
+        """Devuelve al pool la conexión de la petición actual."""
+        connection = g.pop('_db_connection', None)
+        if connection is not None:
+            cls.get_pool().release(connection)
+    
+    @classmethod
+    def close(cls):
+        """Cierra el escritor y las conexiones inactivas del pool."""
+        with cls._write_lock:
+            if cls._writer_connection is not None:
+                cls._writer_connection.close()
+                cls._writer_connection = None
+        if cls._pool is not None:
+            cls._pool.close_all()
+            cls._pool = None
+    
     @classmethod
     def dict_from_row(cls, row):
         """Convierte una Row de SQLite a diccionario."""
@@ -49,26 +292,85 @@ class Database:
         # Convertir sintaxis MySQL a SQLite
         query = cls._convert_query(query)
         
-        connection = None
+        with cls.connection() as connection:
+            try:
+                start = time.perf_counter()
+                cursor = connection.cursor()
+                cursor.execute(query, params or ())
+                
+                result = None
+                rows = 0
+                if fetch_one:
+                    row = cursor.fetchone()
+                    result = cls.dict_from_row(row)
+                    rows = int(row is not None)
+                elif fetch_all:
+                    fetched = cursor.fetchall()
+                    result = [cls.dict_from_row(row) for row in fetched]
+                    rows = len(fetched)
+                cls._record(connection, query, params, start, rows)
+                return result
+            except sqlite3.Error as e:
+                logger.error("Error en consulta: %s\nQuery: %s", e, query)
+                raise
+    
+    @classmethod
+    def execute_raw(cls, query, params=None):
+        """
+        Ejecuta un SELECT y devuelve (nombres de columna, filas como tuplas),
+        sin crear un diccionario por fila.
+        """
+        cls.init_db()
+        query = cls._convert_query(query)
+        
+        with cls.connection() as connection:
+            try:
+                start = time.perf_counter()
+                cursor = connection.cursor()
+                cursor.row_factory = None
+                cursor.execute(query, params or ())
+                rows = cursor.fetchall()
+                columns = [description[0] for description in cursor.description]
+                cls._record(connection, query, params, start, len(rows))
+                return columns, rows
+            except sqlite3.Error as e:
+                logger.error("Error en consulta: %s\nQuery: %s", e, query)
+                raise
+    
+    @classmethod
+    def iter_query(cls, query, params=None, chunk_size=500):
+        """
+        Recorre un SELECT por bloques (fetchmany) sin cargar el resultado entero.
+        Usa su propia conexión del pool mientras dura la iteración, para poder
+        consumirse después de terminar la petición (respuestas en streaming).
+        """
+        cls.init_db()
+        query = cls._convert_query(query)
+        
+        pool = cls.get_pool()
+        connection = pool.acquire()
+        rows = 0
+        # Solo cuenta el tiempo en SQLite, no el de quien consume las filas
+        elapsed = 0.0
         try:
-            connection = cls.get_connection()
+            start = time.perf_counter()
             cursor = connection.cursor()
             cursor.execute(query, params or ())
-            
-            if fetch_one:
-                row = cursor.fetchone()
-                return cls.dict_from_row(row)
-            elif fetch_all:
-                rows = cursor.fetchall()
-                return [cls.dict_from_row(row) for row in rows]
-            return None
+            while True:
+                chunk = cursor.fetchmany(chunk_size)
+                elapsed += time.perf_counter() - start
+                if not chunk:
+                    break
+                rows += len(chunk)
+                for row in chunk:
+                    yield cls.dict_from_row(row)
+                start = time.perf_counter()
+            cls._record(connection, query, params, time.perf_counter() - elapsed, rows)
         except sqlite3.Error as e:
-            print(f"Error en consulta: {e}")
-            print(f"Query: {query}")
+            logger.error("Error en consulta: %s\nQuery: %s", e, query)
             raise
         finally:
-            if connection:
-                connection.close()
+            pool.release(connection)
     
     @classmethod
     def execute_insert(cls, query, params=None):
@@ -78,22 +380,42 @@ class Database:
         cls.init_db()
         query = cls._convert_query(query)
         
-        connection = None
-        try:
-            connection = cls.get_connection()
-            cursor = connection.cursor()
-            cursor.execute(query, params or ())
-            connection.commit()
-            return cursor.lastrowid
-        except sqlite3.Error as e:
-            if connection:
-                connection.rollback()
-            print(f"Error en insert: {e}")
-            print(f"Query: {query}")
-            raise
-        finally:
-            if connection:
-                connection.close()
+        with cls.transaction() as connection:
+            try:
+                start = time.perf_counter()
+                cursor = connection.cursor()
+                cursor.execute(query, params or ())
+                cls._record(connection, query, params, start, cursor.rowcount)
+                cls._mark_written(query)
+                return cursor.lastrowid
+            except sqlite3.Error as e:
+                logger.error("Error en insert: %s\nQuery: %s", e, query)
+                raise
+    
+    @classmethod
+    def execute_many(cls, query, params_list):
+        """
+        Ejecuta un INSERT para cada juego de parámetros en una sola transacción.
+        Devuelve la lista de IDs insertados, en el mismo orden.
+        """
+        cls.init_db()
+        query = cls._convert_query(query)
+        
+        with cls.transaction() as connection:
+            try:
+                start = time.perf_counter()
+                cursor = connection.cursor()
+                ids = []
+                for params in params_list:
+                    cursor.execute(query, params)
+                    ids.append(cursor.lastrowid)
+                cls._record(connection, query, None, start, len(ids))
+                if ids:
+                    cls._mark_written(query)
+                return ids
+            except sqlite3.Error as e:
+                logger.error("Error en insert múltiple: %s\nQuery: %s", e, query)
+                raise
     
     @classmethod
     def execute_update(cls, query, params=None):
@@ -103,76 +425,70 @@ class Database:
         cls.init_db()
         query = cls._convert_query(query)
         
-        connection = None
-        try:
-            connection = cls.get_connection()
-            cursor = connection.cursor()
-            cursor.execute(query, params or ())
-            connection.commit()
-            return cursor.rowcount
-        except sqlite3.Error as e:
-            if connection:
-                connection.rollback()
-            print(f"Error en update/delete: {e}")
-            print(f"Query: {query}")
-            raise
-        finally:
-            if connection:
-                connection.close()
+        with cls.transaction() as connection:
+            try:
+                start = time.perf_counter()
+                cursor = connection.cursor()
+                cursor.execute(query, params or ())
+                cls._record(connection, query, params, start, cursor.rowcount)
+                cls._mark_written(query)
+                return cursor.rowcount
+            except sqlite3.Error as e:
+                logger.error("Error en update/delete: %s\nQuery: %s", e, query)
+                raise
+    
+    @classmethod
+    def _record(cls, connection, query, params, start, rows):
+        """Registra la sentencia en la petición actual y en el log de consultas lentas."""
+        duration_ms = (time.perf_counter() - start) * 1000
+        if has_app_context():
+            if '_db_queries' not in g:
+                g._db_queries = QueryCollector()
+            g._db_queries.record(query, duration_ms, rows)
+        if cls._slow_query_ms is not None and duration_ms >= cls._slow_query_ms:
+            log_slow_query(connection, query, params, duration_ms, rows)
+    
+    @classmethod
+    def get_query_log(cls):
+        """Sentencias ejecutadas en la petición actual (o None fuera de Flask)."""
+        if has_app_context():
+            return g.get('_db_queries')
+        return None
+    
+    @classmethod
+    def _add_query_headers(cls, response):
+        """Añade a la respuesta el número de consultas y el tiempo en BD."""
+        collector = g.get('_db_queries') or QueryCollector()
+        response.headers.update(collector.headers())
+        return response
     
     @classmethod
     def _convert_query(cls, query):
         """Convierte sintaxis MySQL a SQLite."""
-        import re
-        
-        # Reemplazar %s por ? (placeholders)
-        query = query.replace('%s', '?')
-        
-        # Convertir DATE_SUB(CURDATE(), INTERVAL ? DAY) -> date('now', '-' || ? || ' days')
-        # La regex busca el patrón completo con posibles espacios
-        query = re.sub(
-            r"DATE_SUB\s*\(\s*CURDATE\s*\(\s*\)\s*,\s*INTERVAL\s+\?\s+DAY\s*\)",
-            "date('now', '-' || ? || ' days')",
-            query,
-            flags=re.IGNORECASE
-        )
-        
-        # Convertir DATE_SUB(CURDATE(), INTERVAL ? MONTH) -> date('now', '-' || ? || ' months')
-        query = re.sub(
-            r"DATE_SUB\s*\(\s*CURDATE\s*\(\s*\)\s*,\s*INTERVAL\s+\?\s+MONTH\s*\)",
-            "date('now', '-' || ? || ' months')",
-            query,
-            flags=re.IGNORECASE
-        )
-        
-        # Convertir CURDATE() -> date('now')
-        query = re.sub(r"CURDATE\s*\(\s*\)", "date('now')", query, flags=re.IGNORECASE)
-        
-        # Convertir NOW() -> datetime('now')
-        query = re.sub(r"NOW\s*\(\s*\)", "datetime('now')", query, flags=re.IGNORECASE)
-        
-        # Convertir ON DUPLICATE KEY UPDATE a INSERT OR REPLACE (simplificado)
-        # SQLite usa INSERT OR REPLACE o INSERT ... ON CONFLICT
-        if 'ON DUPLICATE KEY UPDATE' in query.upper():
-            # Simplificar: quitar la parte ON DUPLICATE KEY UPDATE
-            query = re.sub(
-                r"\s*ON\s+DUPLICATE\s+KEY\s+UPDATE\s+.*$",
-                "",
-                query,
-                flags=re.IGNORECASE | re.DOTALL
-            )
-            # Cambiar INSERT a INSERT OR REPLACE
-            query = re.sub(r"INSERT\s+INTO", "INSERT OR REPLACE INTO", query, flags=re.IGNORECASE)
-        
-        return query
+        return cls._translator.translate(query)
+    
+    @classmethod
+    def translation_stats(cls):
+        """Aciertos y fallos de la caché de traducción de consultas."""
+        return cls._translator.stats()
     
     @classmethod
     def init_db(cls):
         """Inicializa la base de datos con el esquema."""
         if cls._initialized:
             return
-            
-        connection = cls.get_connection()
+        
+        with cls._write_lock:
+            if not cls._initialized:
+                with cls.writer() as connection:
+                    cls._create_schema(connection)
+                    run_migrations(connection)
+                cls._initialized = True
+                print(f"✓ Base de datos inicializada en: {cls.get_db_path()}")
+    
+    @classmethod
+    def _create_schema(cls, connection):
+        """Crea las tablas y los datos por defecto."""
         cursor = connection.cursor()
         
         # Crear tablas
@@ -443,6 +759,3 @@ class Database:
             ''', foods)
         
         connection.commit()
-        connection.close()
-        cls._initialized = True
-        print(f"✓ Base de datos inicializada en: {cls.get_db_path()}")
@@ -0,0 +1,87 @@
+"""
+Traducción de sintaxis MySQL a SQLite
+Las reglas se compilan una sola vez y cada consulta traducida se guarda en caché
+"""
+
+import re
+import threading
+
+
+# Literales entre comillas simples: se respetan tal cual (p. ej. strftime('%s', ...))
+_LITERAL_OR_PLACEHOLDER = re.compile(r"'(?:[^']|'')*'|%s")
+
+# (patrón, reemplazo) aplicados en orden
+_RULES = [
+    # DATE_SUB(CURDATE(), INTERVAL ? DAY) -> date('now', '-' || ? || ' days')
+    (re.compile(r"DATE_SUB\s*\(\s*CURDATE\s*\(\s*\)\s*,\s*INTERVAL\s+\?\s+DAY\s*\)", re.IGNORECASE),
+     "date('now', '-' || ? || ' days')"),
+    # DATE_SUB(CURDATE(), INTERVAL ? MONTH) -> date('now', '-' || ? || ' months')
+    (re.compile(r"DATE_SUB\s*\(\s*CURDATE\s*\(\s*\)\s*,\s*INTERVAL\s+\?\s+MONTH\s*\)", re.IGNORECASE),
+     "date('now', '-' || ? || ' months')"),
+    # CURDATE() -> date('now')
+    (re.compile(r"CURDATE\s*\(\s*\)", re.IGNORECASE), "date('now')"),
+    # NOW() -> datetime('now')
+    (re.compile(r"NOW\s*\(\s*\)", re.IGNORECASE), "datetime('now')"),
+]
+
+# ON DUPLICATE KEY UPDATE -> INSERT OR REPLACE (simplificado)
+_ON_DUPLICATE = re.compile(r"\s*ON\s+DUPLICATE\s+KEY\s+UPDATE\s+.*$", re.IGNORECASE | re.DOTALL)
+_INSERT_INTO = re.compile(r"INSERT\s+INTO", re.IGNORECASE)
+
+
+class QueryTranslator:
+    """Traduce consultas MySQL a SQLite con caché de resultados."""
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def translate(self, query):
+        """Devuelve la consulta traducida (desde la caché si ya se vio)."""
+        translated = self._cache.get(query)
+        if translated is not None:
+            with self._lock:
+                self.hits += 1
+            return translated
+
+        translated = self._convert(query)
+        with self._lock:
+            self.misses += 1
+            # Los modelos usan consultas estáticas; si algo genera SQL dinámico
+            # se vacía la caché en lugar de crecer sin límite
+            if len(self._cache) >= self.max_size:
+                self._cache.clear()
+            self._cache[query] = translated
+        return translated
+
+    def stats(self):
+        """Estadísticas de la caché."""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._cache)}
+
+    def clear(self):
+        """Vacía la caché y reinicia los contadores."""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @staticmethod
+    def _convert(query):
+        """Aplica las reglas de traducción."""
+        # Reemplazar %s por ? (placeholders), sin tocar literales
+        query = _LITERAL_OR_PLACEHOLDER.sub(
+            lambda m: '?' if m.group(0) == '%s' else m.group(0), query
+        )
+
+        for pattern, replacement in _RULES:
+            query = pattern.sub(replacement, query)
+
+        # SQLite usa INSERT OR REPLACE o INSERT ... ON CONFLICT
+        if _ON_DUPLICATE.search(query):
+            query = _ON_DUPLICATE.sub("", query)
+            query = _INSERT_INTO.sub("INSERT OR REPLACE INTO", query)
+
+        return query
@@ -0,0 +1,123 @@
+"""
+Exportación del historial completo de un usuario
+Se recorre cada tabla con Database.iter_query y se escribe línea a línea (NDJSON o CSV),
+de modo que la memoria no depende de la cantidad de datos
+"""
+
+import csv
+import io
+import json
+from app.models.database import Database
+
+
+# Tabla exportada -> consulta (parámetro: user_id). Orden cronológico.
+EXPORT_TABLES = {
+    'workouts': """
+        SELECT ws.id AS session_id, ws.session_date, ws.start_time, ws.end_time,
+               ws.training_day_id, ws.notes AS session_notes,
+               wset.id AS set_id, wset.exercise_id, e.name AS exercise_name,
+               wset.set_number, wset.weight_kg, wset.reps, wset.rpe, wset.is_warmup,
+               wset.notes AS set_notes
+        FROM workout_sessions ws
+        LEFT JOIN workout_sets wset ON wset.session_id = ws.id
+        LEFT JOIN exercises e ON e.id = wset.exercise_id
+        WHERE ws.user_id = %s
+        ORDER BY ws.session_date, ws.id, wset.exercise_id, wset.set_number
+    """,
+    'food_logs': """
+        SELECT fl.id, fl.log_date, fl.meal_type, fl.food_id, f.name AS food_name,
+               fl.quantity, f.calories * fl.quantity AS calories,
+               f.protein_g * fl.quantity AS protein_g,
+               f.carbs_g * fl.quantity AS carbs_g,
+               f.fat_g * fl.quantity AS fat_g,
+               fl.created_at
+        FROM food_logs fl
+        JOIN foods f ON f.id = fl.food_id
+        WHERE fl.user_id = %s
+        ORDER BY fl.log_date, fl.meal_type, fl.id
+    """,
+    'water_logs': "SELECT * FROM water_logs WHERE user_id = %s ORDER BY log_date",
+    'body_measurements': "SELECT * FROM body_measurements WHERE user_id = %s ORDER BY measurement_date, id",
+    'sleep_logs': "SELECT * FROM sleep_logs WHERE user_id = %s ORDER BY log_date, id",
+    'step_logs': "SELECT * FROM step_logs WHERE user_id = %s ORDER BY log_date",
+    'menstrual_logs': "SELECT * FROM menstrual_logs WHERE user_id = %s ORDER BY log_date, id",
+}
+
+# Tamaño aproximado de cada bloque enviado (bytes)
+CHUNK_SIZE = 64 * 1024
+
+# Columnas de cada serie dentro de una sesión (NDJSON agrupa las series en la sesión)
+_SET_COLUMNS = ('set_id', 'exercise_id', 'exercise_name', 'set_number',
+                'weight_kg', 'reps', 'rpe', 'is_warmup', 'set_notes')
+
+
+def iter_rows(user_id, table):
+    """Filas de una tabla exportada, en streaming."""
+    return Database.iter_query(EXPORT_TABLES[table], (user_id,))
+
+
+def _iter_sessions(user_id):
+    """Sesiones con sus series anidadas (las filas llegan ordenadas por sesión)."""
+    current = None
+    for row in iter_rows(user_id, 'workouts'):
+        if current is None or current['id'] != row['session_id']:
+            if current is not None:
+                yield current
+            current = {
+                'id': row['session_id'],
+                'session_date': row['session_date'],
+                'start_time': row['start_time'],
+                'end_time': row['end_time'],
+                'training_day_id': row['training_day_id'],
+                'notes': row['session_notes'],
+                'sets': [],
+            }
+        if row['set_id'] is not None:
+            current['sets'].append({column: row[column] for column in _SET_COLUMNS})
+    if current is not None:
+        yield current
+
+
+def _chunks(lines):
+    """Agrupa las líneas en bloques de ~CHUNK_SIZE para no enviar una por una."""
+    parts = []
+    size = 0
+    for line in lines:
+        parts.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(parts)
+            parts = []
+            size = 0
+    if parts:
+        yield ''.join(parts)
+
+
+def _ndjson_lines(user_id, tables):
+    for table in tables:
+        records = _iter_sessions(user_id) if table == 'workouts' else iter_rows(user_id, table)
+        for record in records:
+            yield json.dumps({'table': table, 'data': record}, ensure_ascii=False, default=str) + '\n'
+
+
+def _csv_lines(user_id, table):
+    buffer = io.StringIO()
+    writer = None
+    for row in iter_rows(user_id, table):
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+
+def iter_ndjson(user_id, tables=None):
+    """Una línea JSON por registro: {"table": ..., "data": {...}}; las sesiones llevan sus series."""
+    return _chunks(_ndjson_lines(user_id, tables or list(EXPORT_TABLES)))
+
+
+def iter_csv(user_id, table):
+    """CSV de una tabla: cabecera y una línea por fila (workouts: una línea por serie)."""
+    return _chunks(_csv_lines(user_id, table))
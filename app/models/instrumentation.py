@@ -0,0 +1,46 @@
+"""
+Instrumentación de consultas
+Recoge SQL, duración y filas de cada sentencia de la petición actual
+"""
+
+import logging
+
+
+slow_query_logger = logging.getLogger('gymgraph.slow_queries')
+
+
+class QueryCollector:
+    """Registro de las sentencias ejecutadas durante una petición."""
+
+    def __init__(self):
+        self.statements = []
+        self.total_ms = 0.0
+
+    def record(self, query, duration_ms, rows):
+        self.statements.append({'sql': query, 'duration_ms': duration_ms, 'rows': rows})
+        self.total_ms += duration_ms
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def headers(self):
+        """Cabeceras HTTP con el resumen de la petición."""
+        return {
+            'X-DB-Query-Count': str(self.count),
+            'X-DB-Time-Ms': f"{self.total_ms:.2f}",
+            'Server-Timing': f'db;dur={self.total_ms:.2f};desc="{self.count} queries"',
+        }
+
+
+def log_slow_query(connection, query, params, duration_ms, rows):
+    """Escribe una consulta lenta en el log junto con su plan de ejecución."""
+    try:
+        plan = connection.execute(f"EXPLAIN QUERY PLAN {query}", params or ()).fetchall()
+        plan_text = '\n'.join(f"    {row[3]}" for row in plan)
+    except Exception as e:
+        plan_text = f"    (sin plan: {e})"
+    slow_query_logger.warning(
+        "Consulta lenta (%.2f ms, %s filas):\n%s\n  Plan:\n%s",
+        duration_ms, rows, ' '.join(query.split()), plan_text
+    )
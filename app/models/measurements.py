@@ -3,6 +3,7 @@ Modelos de Medidas Corporales y Autocuidado
 """
 
 from app.models.database import Database
+from app.models.rollup import DailyMetrics
 
 
 class BodyMeasurement:
@@ -49,7 +50,9 @@ class BodyMeasurement:
                      self.hips_cm, self.bicep_left_cm, self.bicep_right_cm,
                      self.thigh_left_cm, self.thigh_right_cm, self.calf_left_cm,
                      self.calf_right_cm, self.neck_cm, self.shoulders_cm, self.notes)
-            self.id = Database.execute_insert(query, params)
+            with Database.transaction():
+                self.id = Database.execute_insert(query, params)
+                DailyMetrics.refresh(self.user_id, self.measurement_date)
         return self
     
     @classmethod
@@ -121,21 +124,34 @@ class SleepLog:
         self.notes = notes
         self.created_at = created_at
     
+    _upsert_query = """
+        INSERT INTO sleep_logs (user_id, log_date, hours_slept, sleep_quality, notes)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE 
+        hours_slept = VALUES(hours_slept),
+        sleep_quality = VALUES(sleep_quality),
+        notes = VALUES(notes)
+    """
+    
+    def _upsert_params(self):
+        return (self.user_id, self.log_date, self.hours_slept,
+                self.sleep_quality, self.notes)
+    
     def save(self):
         """Guarda el registro de sueño."""
-        query = """
-            INSERT INTO sleep_logs (user_id, log_date, hours_slept, sleep_quality, notes)
-            VALUES (%s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE 
-            hours_slept = VALUES(hours_slept),
-            sleep_quality = VALUES(sleep_quality),
-            notes = VALUES(notes)
-        """
-        params = (self.user_id, self.log_date, self.hours_slept, 
-                 self.sleep_quality, self.notes)
-        Database.execute_insert(query, params)
+        with Database.transaction():
+            Database.execute_insert(self._upsert_query, self._upsert_params())
+            DailyMetrics.refresh(self.user_id, self.log_date)
         return self
     
+    @classmethod
+    def save_many(cls, logs):
+        """Guarda varios registros de sueño en una sola transacción."""
+        with Database.transaction():
+            Database.execute_many(cls._upsert_query, [log._upsert_params() for log in logs])
+            DailyMetrics.refresh_many((log.user_id, log.log_date) for log in logs)
+        return logs
+    
     @classmethod
     def get_by_user(cls, user_id, days=30):
         """Obtiene registros de sueño."""
@@ -213,17 +229,30 @@ class StepLog:
         self.steps = steps
         self.created_at = created_at
     
+    _upsert_query = """
+        INSERT INTO step_logs (user_id, log_date, steps)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE steps = VALUES(steps)
+    """
+    
+    def _upsert_params(self):
+        return (self.user_id, self.log_date, self.steps)
+    
     def save(self):
         """Guarda el registro de pasos."""
-        query = """
-            INSERT INTO step_logs (user_id, log_date, steps)
-            VALUES (%s, %s, %s)
-            ON DUPLICATE KEY UPDATE steps = VALUES(steps)
-        """
-        params = (self.user_id, self.log_date, self.steps)
-        Database.execute_insert(query, params)
+        with Database.transaction():
+            Database.execute_insert(self._upsert_query, self._upsert_params())
+            DailyMetrics.refresh(self.user_id, self.log_date)
         return self
     
+    @classmethod
+    def save_many(cls, logs):
+        """Guarda varios registros de pasos en una sola transacción."""
+        with Database.transaction():
+            Database.execute_many(cls._upsert_query, [log._upsert_params() for log in logs])
+            DailyMetrics.refresh_many((log.user_id, log.log_date) for log in logs)
+        return logs
+    
     @classmethod
     def get_by_user(cls, user_id, days=30):
         """Obtiene registros de pasos."""
@@ -0,0 +1,198 @@
+"""
+Registro de métricas de las gráficas
+Cada métrica se declara una sola vez; de aquí salen la lista de la API,
+la tabla de agregados diarios (daily_metrics), sus consultas y la agrupación por intervalos
+"""
+
+from app.analytics.strength import e1rm_sql
+
+
+# Tablas de origen: FROM, columnas de usuario, fecha e id (para "último valor del día")
+SOURCES = {
+    'food': {
+        'from': "food_logs fl JOIN foods f ON fl.food_id = f.id",
+        'user': 'fl.user_id', 'date': 'fl.log_date', 'id': 'fl.id',
+    },
+    'water': {
+        'from': "water_logs",
+        'user': 'user_id', 'date': 'log_date', 'id': 'id',
+    },
+    'body': {
+        'from': "body_measurements",
+        'user': 'user_id', 'date': 'measurement_date', 'id': 'id',
+    },
+    'sleep': {
+        'from': "sleep_logs",
+        'user': 'user_id', 'date': 'log_date', 'id': 'id',
+    },
+    'steps': {
+        'from': "step_logs",
+        'user': 'user_id', 'date': 'log_date', 'id': 'id',
+    },
+    'workout_sets': {
+        'from': "workout_sessions ws JOIN workout_sets wset ON wset.session_id = ws.id",
+        'user': 'ws.user_id', 'date': 'ws.session_date', 'id': 'wset.id',
+        'param': 'wset.exercise_id',  # métricas por ejercicio
+    },
+    'workout_sessions': {
+        'from': "workout_sessions",
+        'user': 'user_id', 'date': 'session_date', 'id': 'id',
+    },
+}
+
+# Cómo se combinan las filas de un día (rollup) ...
+DAILY_AGGREGATES = {
+    'sum': "SUM({value})",
+    'count': "COUNT({value})",
+    'max': "MAX({value})",
+    # Último valor no nulo del día según el id: MAX sobre '000000000123|valor'
+    'latest': "CAST(substr(MAX(printf('%012d|', {id}) || ({value})), 14) AS REAL)",
+}
+
+# ... y cómo se combinan los días de una semana o mes
+BUCKET_AGGREGATES = {
+    'sum': "SUM({column})",
+    'avg': "AVG({column})",
+    'max': "MAX({column})",
+    # Último valor no nulo del intervalo: MAX sobre 'YYYY-MM-DD|valor'
+    'last': "CAST(substr(MAX({date} || '|' || {column}), 12) AS REAL)",
+}
+
+
+class Metric:
+    """Definición de una métrica."""
+
+    def __init__(self, id, name, category, unit, color, source, expression,
+                 daily='sum', bucket='sum', null_filter=None, column=None, parameter=None):
+        self.id = id
+        self.name = name
+        self.category = category
+        self.unit = unit
+        self.color = color
+        self.source = source            # clave de SOURCES
+        self.expression = expression    # valor de cada fila del origen
+        self.daily = daily              # DAILY_AGGREGATES
+        self.bucket = bucket            # BUCKET_AGGREGATES
+        self.null_filter = null_filter  # condición para que la fila cuente
+        self.column = column or id      # columna en daily_metrics
+        self.parameter = parameter      # métricas con parámetro ('exercise_volume:<id>') no van al rollup
+
+    @property
+    def value_sql(self):
+        """Expresión por fila, NULL cuando la fila no cuenta."""
+        if self.null_filter:
+            return f"CASE WHEN {self.null_filter} THEN {self.expression} END"
+        return self.expression
+
+    def daily_sql(self):
+        """Agregado de las filas de un día."""
+        source = SOURCES[self.source]
+        return DAILY_AGGREGATES[self.daily].format(value=self.value_sql, id=source['id'])
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'category': self.category,
+            'unit': self.unit,
+            'color': self.color,
+        }
+
+
+def _average(left, right):
+    """Media de dos lados (izquierdo/derecho) ignorando el que falte."""
+    return f"(COALESCE({left}, 0) + COALESCE({right}, 0)) / 2.0"
+
+
+# Paleta retro-moderna cálida
+REGISTRY = [
+    # Nutrición
+    Metric('calories', 'Calorías', 'Nutrición', 'kcal', '#C67B5C',            # terracotta
+           'food', "f.calories * fl.quantity"),
+    Metric('protein', 'Proteína', 'Nutrición', 'g', '#6B7B8C',                 # slate-blue
+           'food', "f.protein_g * fl.quantity", column='protein_g'),
+    Metric('carbs', 'Carbohidratos', 'Nutrición', 'g', '#E8D4A8',              # soft-yellow
+           'food', "f.carbs_g * fl.quantity", column='carbs_g'),
+    Metric('fat', 'Grasas', 'Nutrición', 'g', '#D4956C',                       # muted-orange
+           'food', "f.fat_g * fl.quantity", column='fat_g'),
+    Metric('fiber', 'Fibra', 'Nutrición', 'g', '#7C8C6C',                      # olive
+           'food', "f.fiber_g * fl.quantity", column='fiber_g'),
+    Metric('water', 'Agua', 'Nutrición', 'L', '#8C9DAD',                       # dusty-blue
+           'water', "liters", column='water_l'),
+
+    # Medidas corporales
+    Metric('weight', 'Peso', 'Medidas', 'kg', '#8FA584',                       # sage
+           'body', "weight_kg", daily='latest', bucket='avg', column='weight_kg'),
+    Metric('body_fat', '% Grasa corporal', 'Medidas', '%', '#B85C4C',          # brick
+           'body', "body_fat_percentage", daily='latest', bucket='last', column='body_fat_percentage'),
+    Metric('chest', 'Pecho', 'Medidas', 'cm', '#A5B5C5',                       # soft-blue
+           'body', "chest_cm", daily='latest', bucket='last', column='chest_cm'),
+    Metric('waist', 'Cintura', 'Medidas', 'cm', '#CC8860',                     # warm-orange
+           'body', "waist_cm", daily='latest', bucket='last', column='waist_cm'),
+    Metric('hips', 'Cadera', 'Medidas', 'cm', '#7C8C6C',                       # olive
+           'body', "hips_cm", daily='latest', bucket='last', column='hips_cm'),
+    Metric('biceps', 'Bíceps (media)', 'Medidas', 'cm', '#9E5A4C',             # rust
+           'body', _average('bicep_left_cm', 'bicep_right_cm'), daily='latest', bucket='last',
+           null_filter="bicep_left_cm IS NOT NULL OR bicep_right_cm IS NOT NULL", column='biceps_cm'),
+    Metric('thighs', 'Muslos (media)', 'Medidas', 'cm', '#A85D42',             # terracotta-dark
+           'body', _average('thigh_left_cm', 'thigh_right_cm'), daily='latest', bucket='last',
+           null_filter="thigh_left_cm IS NOT NULL OR thigh_right_cm IS NOT NULL", column='thighs_cm'),
+    Metric('calves', 'Gemelos (media)', 'Medidas', 'cm', '#C67B5C',            # terracotta
+           'body', _average('calf_left_cm', 'calf_right_cm'), daily='latest', bucket='last',
+           null_filter="calf_left_cm IS NOT NULL OR calf_right_cm IS NOT NULL", column='calves_cm'),
+    Metric('neck', 'Cuello', 'Medidas', 'cm', '#6B7B8C',                       # slate-blue
+           'body', "neck_cm", daily='latest', bucket='last', column='neck_cm'),
+    Metric('shoulders', 'Hombros', 'Medidas', 'cm', '#D4956C',                 # muted-orange
+           'body', "shoulders_cm", daily='latest', bucket='last', column='shoulders_cm'),
+
+    # Autocuidado
+    Metric('sleep_hours', 'Horas de sueño', 'Autocuidado', 'h', '#6B7B8C',     # slate-blue
+           'sleep', "hours_slept", daily='latest', bucket='avg'),
+    Metric('sleep_quality', 'Calidad de sueño', 'Autocuidado', '/10', '#8C9DAD',  # dusty-blue
+           'sleep', "sleep_quality", daily='latest', bucket='avg'),
+    Metric('steps', 'Pasos', 'Autocuidado', 'pasos', '#8FA584',                # sage
+           'steps', "steps"),
+
+    # Entrenamiento
+    Metric('workout_volume', 'Volumen total (peso x reps)', 'Entrenamiento', 'kg', '#B85C4C',  # brick
+           'workout_sets', "wset.weight_kg * wset.reps"),
+    Metric('workout_sets', 'Series totales', 'Entrenamiento', 'series', '#A5B5C5',  # soft-blue
+           'workout_sets', "wset.id", daily='count'),
+    Metric('workout_duration', 'Duración entrenamientos', 'Entrenamiento', 'min', '#7C8C6C',  # olive
+           'workout_sessions', "(strftime('%s', end_time) - strftime('%s', start_time)) / 60.0",
+           null_filter="start_time IS NOT NULL AND end_time IS NOT NULL", column='workout_minutes'),
+    Metric('exercise_volume', 'Volumen', 'Entrenamiento', 'kg', '#9E5A4C',     # rust
+           'workout_sets', "wset.weight_kg * wset.reps", parameter='exercise_id'),
+    # 1RM estimado (Epley ajustado por RPE) de la mejor serie del día, sin calentamientos
+    Metric('e1rm', '1RM estimado', 'Entrenamiento', 'kg', '#B85C4C',          # brick
+           'workout_sets', e1rm_sql('wset.weight_kg', 'wset.reps', 'wset.rpe'),
+           daily='max', bucket='max', parameter='exercise_id',
+           null_filter="wset.weight_kg > 0 AND wset.reps > 0 AND COALESCE(wset.is_warmup, 0) = 0"),
+]
+
+METRICS = {metric.id: metric for metric in REGISTRY}
+
+# Métricas guardadas en daily_metrics (las que no llevan parámetro)
+DAILY_METRICS = [metric for metric in REGISTRY if metric.parameter is None]
+
+# Métricas por ejercicio ('<métrica>:<exercise_id>')
+EXERCISE_METRICS = [metric for metric in REGISTRY if metric.parameter == 'exercise_id']
+
+# Colores para las métricas por ejercicio
+PALETTE = ['#C67B5C', '#6B7B8C', '#8FA584', '#B85C4C', '#D4956C', '#8C9DAD', '#7C8C6C', '#9E5A4C']
+
+
+def resolve(metric_id):
+    """
+    Devuelve (Metric, parámetro) para un id como 'weight' o 'exercise_volume:120';
+    None si la métrica no existe o el parámetro no es válido.
+    """
+    base, _, parameter = metric_id.partition(':')
+    metric = METRICS.get(base)
+    if metric is None:
+        return None
+    if metric.parameter is None:
+        return (metric, None) if not parameter else None
+    if not parameter.isdigit():
+        return None
+    return metric, int(parameter)
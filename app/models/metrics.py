@@ -0,0 +1,181 @@
+"""
+Consultas de métricas para las gráficas
+Las métricas se definen en app/models/metric_registry.py
+Los valores diarios se leen de daily_metrics con una sola consulta; las métricas con
+parámetro (volumen por ejercicio) se calculan con una consulta por tabla de origen
+"""
+
+from functools import lru_cache
+import numpy as np
+from app.models.database import Database
+from app.models.metric_registry import SOURCES, DAILY_AGGREGATES, BUCKET_AGGREGATES, resolve
+
+
+# Inicio de cada intervalo a partir de la fecha diaria (None = sin agrupar)
+RESOLUTIONS = {
+    'day': None,
+    'week': "date({date}, 'weekday 0', '-6 days')",   # lunes de la semana
+    'month': "strftime('%Y-%m-01', {date})",
+}
+
+# Consulta sobre una tabla de valores diarios (daily_metrics o calculada al vuelo).
+# Recibe (user_id, start_date, end_date) y devuelve 'date' y una columna m0..mN por métrica.
+SERIES_QUERY = """
+    SELECT {date} as date, {columns}
+    FROM {table}
+    {where}
+    {group}
+    ORDER BY 1
+"""
+
+RANGE_FILTER = "WHERE user_id = ? AND metric_date BETWEEN ? AND ?"
+
+# Valores diarios de las métricas con parámetro (p. ej. volumen por ejercicio),
+# calculados desde su tabla de origen solo para los parámetros pedidos
+PARAMETER_TABLE = """(
+        SELECT {date} AS metric_date, {columns}
+        FROM {source}
+        WHERE {user} = ? AND {date} BETWEEN ? AND ? AND {param} IN ({values})
+        GROUP BY {date}
+    )"""
+
+
+def _parameter_table(source_name, resolved):
+    """FROM para métricas con parámetro; cada una se filtra con CASE sobre su parámetro."""
+    source = SOURCES[source_name]
+    columns = []
+    for position, (metric, parameter) in enumerate(resolved):
+        value = f"CASE WHEN {source['param']} = {parameter:d} THEN {metric.value_sql} END"
+        columns.append(f"{DAILY_AGGREGATES[metric.daily].format(value=value, id=source['id'])} AS c{position}")
+    return PARAMETER_TABLE.format(
+        date=source['date'], user=source['user'], param=source['param'],
+        source=source['from'],
+        columns=",\n               ".join(columns),
+        values=', '.join(sorted({f"{parameter:d}" for _, parameter in resolved})),
+    )
+
+
+@lru_cache(maxsize=256)
+def _build_query(source, metric_ids, resolution='day'):
+    """SQL de un origen para un conjunto de métricas (siempre el mismo texto para el mismo conjunto)."""
+    resolved = [resolve(metric_id) for metric_id in metric_ids]
+    if source == 'daily':
+        table, where = 'daily_metrics', RANGE_FILTER
+        daily_columns = [metric.column for metric, _ in resolved]
+    else:
+        table, where = _parameter_table(source, resolved), ''
+        daily_columns = [f"c{position}" for position in range(len(resolved))]
+
+    bucket = RESOLUTIONS[resolution]
+    expressions = []
+    for position, ((metric, _), column) in enumerate(zip(resolved, daily_columns)):
+        if bucket is not None:
+            column = BUCKET_AGGREGATES[metric.bucket].format(column=column, date='metric_date')
+        expressions.append(f"{column} as m{position}")
+    return SERIES_QUERY.format(
+        date='metric_date' if bucket is None else bucket.format(date='metric_date'),
+        columns=",\n           ".join(expressions),
+        table=table,
+        where=where,
+        group='' if bucket is None else 'GROUP BY 1',
+    )
+
+
+def _group_by_source(metric_ids):
+    """
+    {origen: tupla ordenada de métricas}: 'daily' para las de daily_metrics y el nombre
+    de la tabla de origen para las que llevan parámetro. Las métricas desconocidas se ignoran.
+    """
+    by_source = {}
+    for metric_id in metric_ids:
+        resolved = resolve(metric_id)
+        if resolved is None:
+            continue
+        metric, parameter = resolved
+        source = 'daily' if parameter is None else metric.source
+        by_source.setdefault(source, set()).add(metric_id)
+    return {source: tuple(sorted(ids)) for source, ids in by_source.items()}
+
+
+def format_points(rows, column):
+    """Convierte filas en puntos {date, value}, descartando valores nulos."""
+    formatted = []
+    for row in rows:
+        value = row[column]
+        if value is not None:
+            formatted.append({
+                'date': str(row['date']),
+                'value': round(float(value), 2) if value else 0
+            })
+    return formatted
+
+
+def fetch_metric_series(user_id, metric_ids, start_date, end_date, resolution='day'):
+    """
+    Obtiene varias métricas con una consulta por tabla de origen.
+    Con resolution 'week' o 'month' agrupa en SQL; la fecha de cada punto es el inicio del intervalo.
+    Devuelve {metric_id: [{'date', 'value'}, ...]}; las métricas desconocidas quedan vacías.
+    """
+    result = {metric_id: [] for metric_id in metric_ids}
+    for source, ordered_ids in _group_by_source(metric_ids).items():
+        rows = Database.execute_query(
+            _build_query(source, ordered_ids, resolution), (user_id, start_date, end_date)
+        )
+        for position, metric_id in enumerate(ordered_ids):
+            result[metric_id] = format_points(rows, f"m{position}")
+
+    return result
+
+
+def fetch_metric_columns(user_id, metric_ids, start_date, end_date, resolution='day'):
+    """
+    Como fetch_metric_series, pero en columnas NumPy y sin objetos por fila:
+    {metric_id: (días desde 1970-01-01 en int32, valores float64)}.
+    """
+    empty = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64))
+    result = {metric_id: empty for metric_id in metric_ids}
+    for source, ordered_ids in _group_by_source(metric_ids).items():
+        _, rows = Database.execute_raw(
+            _build_query(source, ordered_ids, resolution), (user_id, start_date, end_date)
+        )
+        if not rows:
+            continue
+        table = list(zip(*rows))
+        days = np.array(table[0], dtype='datetime64[D]').astype(np.int32)
+        for position, metric_id in enumerate(ordered_ids, start=1):
+            values = np.array(table[position], dtype=np.float64)  # None -> NaN
+            present = ~np.isnan(values)
+            result[metric_id] = (days[present], np.round(values[present], 2))
+
+    return result
+
+
+def fetch_set_columns(user_id, exercise_id=None):
+    """
+    Series del usuario (sin calentamientos) en columnas NumPy, ordenadas por ejercicio,
+    fecha y sesión: exercise_id, session_id, day (días desde 1970-01-01), weight, reps y
+    rpe (NaN sin dato). Una sola consulta para todo el historial.
+    """
+    query = """
+        SELECT wset.exercise_id, ws.id, ws.session_date, wset.weight_kg, wset.reps, wset.rpe
+        FROM workout_sessions ws
+        JOIN workout_sets wset ON wset.session_id = ws.id
+        WHERE ws.user_id = ? AND COALESCE(wset.is_warmup, 0) = 0 {exercise_filter}
+        ORDER BY wset.exercise_id, ws.session_date, ws.id
+    """
+    params = (user_id,)
+    if exercise_id is not None:
+        params += (exercise_id,)
+    _, rows = Database.execute_raw(
+        query.format(exercise_filter='' if exercise_id is None else 'AND wset.exercise_id = ?'),
+        params
+    )
+    table = list(zip(*rows)) or [()] * 6
+    return {
+        'exercise_id': np.array(table[0], dtype=np.int64),
+        'session_id': np.array(table[1], dtype=np.int64),
+        'day': np.array([str(day)[:10] for day in table[2]], dtype='datetime64[D]').astype(np.int32),
+        'weight': np.array(table[3], dtype=np.float64),   # None -> NaN
+        'reps': np.array(table[4], dtype=np.float64),
+        'rpe': np.array(table[5], dtype=np.float64),
+    }
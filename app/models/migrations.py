@@ -0,0 +1,165 @@
+"""
+Migraciones del esquema SQLite
+La versión aplicada se guarda en PRAGMA user_version
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _rebuild_daily_metrics(connection):
+    """Rellena daily_metrics con los registros existentes."""
+    # Import diferido: rollup depende de Database, que a su vez usa este módulo
+    from app.models.rollup import rebuild_daily_metrics
+    rebuild_daily_metrics(connection)
+
+
+def _rebuild_personal_records(connection):
+    """Rellena personal_records con las series existentes."""
+    from app.models.records import rebuild_personal_records
+    rebuild_personal_records(connection)
+
+
+# (versión, descripción, sentencias). Nunca modificar una migración ya publicada:
+# los cambios nuevos se añaden al final con la siguiente versión.
+# Una sentencia puede ser SQL o una función que recibe la conexión.
+MIGRATIONS = [
+    (1, 'Índices compuestos para las consultas por usuario y fecha', [
+        # Historial y gráficas de entrenamiento (ORDER BY session_date DESC, start_time DESC)
+        "CREATE INDEX IF NOT EXISTS idx_workout_sessions_user_date "
+        "ON workout_sessions(user_id, session_date, start_time)",
+        # Series de una sesión (ORDER BY exercise_id, set_number) y JOIN desde sesiones
+        "CREATE INDEX IF NOT EXISTS idx_workout_sets_session "
+        "ON workout_sets(session_id, exercise_id, set_number)",
+        # Historial de un ejercicio
+        "CREATE INDEX IF NOT EXISTS idx_workout_sets_exercise "
+        "ON workout_sets(exercise_id, session_id)",
+        # Registros del día (ORDER BY meal_type) y agregados diarios de nutrición
+        "CREATE INDEX IF NOT EXISTS idx_food_logs_user_date "
+        "ON food_logs(user_id, log_date, meal_type)",
+        "CREATE INDEX IF NOT EXISTS idx_body_measurements_user_date "
+        "ON body_measurements(user_id, measurement_date)",
+        "CREATE INDEX IF NOT EXISTS idx_sleep_logs_user_date "
+        "ON sleep_logs(user_id, log_date)",
+        "CREATE INDEX IF NOT EXISTS idx_menstrual_logs_user_date "
+        "ON menstrual_logs(user_id, log_date)",
+        # Planes: listado por usuario y árbol días -> ejercicios
+        "CREATE INDEX IF NOT EXISTS idx_training_plans_user "
+        "ON training_plans(user_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_training_days_plan "
+        "ON training_days(plan_id, day_of_week)",
+        "CREATE INDEX IF NOT EXISTS idx_planned_exercises_day "
+        "ON planned_exercises(training_day_id, order_index)",
+        # water_logs y step_logs ya tienen UNIQUE(user_id, log_date)
+    ]),
+    (2, 'Columna is_warmup en workout_sets (como en database/schema.sql)', [
+        "ALTER TABLE workout_sets ADD COLUMN is_warmup INTEGER DEFAULT 0",
+    ]),
+    (3, 'Tabla de agregados diarios daily_metrics', [
+        """
+        CREATE TABLE IF NOT EXISTS daily_metrics (
+            user_id INTEGER NOT NULL,
+            metric_date DATE NOT NULL,
+            calories REAL,
+            protein_g REAL,
+            carbs_g REAL,
+            fat_g REAL,
+            water_l REAL,
+            workout_volume REAL,
+            workout_sets INTEGER,
+            workout_minutes REAL,
+            sleep_hours REAL,
+            sleep_quality REAL,
+            steps INTEGER,
+            weight_kg REAL,
+            body_fat_percentage REAL,
+            chest_cm REAL,
+            waist_cm REAL,
+            hips_cm REAL,
+            biceps_cm REAL,
+            thighs_cm REAL,
+            PRIMARY KEY (user_id, metric_date),
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+        """,
+        _rebuild_daily_metrics,
+    ]),
+    (4, 'Fibra y medidas de gemelos, cuello y hombros en daily_metrics', [
+        "ALTER TABLE daily_metrics ADD COLUMN fiber_g REAL",
+        "ALTER TABLE daily_metrics ADD COLUMN calves_cm REAL",
+        "ALTER TABLE daily_metrics ADD COLUMN neck_cm REAL",
+        "ALTER TABLE daily_metrics ADD COLUMN shoulders_cm REAL",
+        _rebuild_daily_metrics,
+    ]),
+    (5, 'Claves de idempotencia de la sincronización de entrenamientos', [
+        """
+        CREATE TABLE IF NOT EXISTS sync_operations (
+            user_id INTEGER NOT NULL,
+            idempotency_key TEXT NOT NULL,
+            operation TEXT NOT NULL,
+            result TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, idempotency_key),
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (6, 'Tabla de récords personales personal_records', [
+        """
+        CREATE TABLE IF NOT EXISTS personal_records (
+            user_id INTEGER NOT NULL,
+            exercise_id INTEGER NOT NULL,
+            record_type TEXT NOT NULL,
+            weight_key REAL NOT NULL DEFAULT 0,
+            value REAL NOT NULL,
+            weight_kg REAL,
+            reps INTEGER,
+            set_id INTEGER,
+            session_id INTEGER,
+            record_date DATE,
+            PRIMARY KEY (user_id, exercise_id, record_type, weight_key),
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+            FOREIGN KEY (exercise_id) REFERENCES exercises(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+        """,
+        _rebuild_personal_records,
+    ]),
+    (7, 'Índice para paginar el historial de entrenamientos por (session_date, id)', [
+        # El índice de la migración 1 tiene start_time en medio y no sirve para esta clave
+        "CREATE INDEX IF NOT EXISTS idx_workout_sessions_user_keyset "
+        "ON workout_sessions(user_id, session_date, id)",
+    ]),
+    (8, 'Récords de 1RM estimado con el ajuste por RPE (como gráficas y progresión)', [
+        _rebuild_personal_records,
+    ]),
+]
+
+
+def get_version(connection):
+    """Versión del esquema aplicada en la base de datos."""
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(connection):
+    """Aplica en orden las migraciones pendientes. Devuelve la versión final."""
+    current = get_version(connection)
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for statement in statements:
+                if callable(statement):
+                    statement(connection)
+                else:
+                    connection.execute(statement)
+            connection.execute(f"PRAGMA user_version = {version}")
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            logger.exception("Error en migración %s: %s", version, description)
+            raise
+        current = version
+        logger.info("Migración %s aplicada: %s", version, description)
+    return current
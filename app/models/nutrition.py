@@ -3,6 +3,7 @@ Modelos de Nutrición
 """
 
 from app.models.database import Database
+from app.models.rollup import DailyMetrics
 
 
 class Food:
@@ -169,20 +170,36 @@ class FoodLog:
         self.unit = unit
         self.created_at = created_at
     
+    # La tabla no tiene columna 'unit', omitirla
+    _insert_query = """
+        INSERT INTO food_logs 
+        (user_id, food_id, log_date, meal_type, quantity)
+        VALUES (%s, %s, %s, %s, %s)
+    """
+    
+    def _insert_params(self):
+        return (self.user_id, self.food_id,
+                self.log_date, self.meal_type, self.quantity)
+    
     def save(self):
         """Guarda el registro."""
         if self.id is None:
-            # La tabla no tiene columna 'unit', omitirla
-            query = """
-                INSERT INTO food_logs 
-                (user_id, food_id, log_date, meal_type, quantity)
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            params = (self.user_id, self.food_id, 
-                     self.log_date, self.meal_type, self.quantity)
-            self.id = Database.execute_insert(query, params)
+            with Database.transaction():
+                self.id = Database.execute_insert(self._insert_query, self._insert_params())
+                DailyMetrics.refresh(self.user_id, self.log_date)
         return self
     
+    @classmethod
+    def save_many(cls, logs):
+        """Guarda varios registros nuevos en una sola transacción."""
+        new_logs = [log for log in logs if log.id is None]
+        with Database.transaction():
+            ids = Database.execute_many(cls._insert_query, [log._insert_params() for log in new_logs])
+            DailyMetrics.refresh_many((log.user_id, log.log_date) for log in new_logs)
+        for log, log_id in zip(new_logs, ids):
+            log.id = log_id
+        return logs
+    
     @classmethod
     def get_by_date(cls, user_id, log_date):
         """Obtiene registros de un día."""
@@ -214,7 +231,14 @@ class FoodLog:
     def delete(self):
         """Elimina el registro."""
         query = "DELETE FROM food_logs WHERE id = %s"
-        return Database.execute_update(query, (self.id,))
+        with Database.transaction():
+            row = Database.execute_query(
+                "SELECT user_id, log_date FROM food_logs WHERE id = %s", (self.id,), fetch_one=True
+            )
+            deleted = Database.execute_update(query, (self.id,))
+            if row:
+                DailyMetrics.refresh(row['user_id'], row['log_date'])
+        return deleted
 
 
 class WaterLog:
@@ -236,7 +260,9 @@ class WaterLog:
             ON DUPLICATE KEY UPDATE liters = VALUES(liters)
         """
         params = (self.user_id, self.log_date, self.liters)
-        Database.execute_insert(query, params)
+        with Database.transaction():
+            Database.execute_insert(query, params)
+            DailyMetrics.refresh(self.user_id, self.log_date)
         return self
     
     @classmethod
@@ -0,0 +1,35 @@
+"""
+Paginación por clave (keyset) de listados largos
+El cursor lleva la clave de la última fila devuelta y la página siguiente empieza justo
+después con una búsqueda en el índice: cuesta lo mismo la primera página que la centésima
+"""
+
+import base64
+import json
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+
+
+class CursorError(ValueError):
+    """Cursor mal formado o de otro listado."""
+
+
+def encode_cursor(*key):
+    """Cursor opaco (base64 URL) con los valores de la clave."""
+    raw = json.dumps(list(key), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Clave de un cursor (tupla de `size` textos o enteros); CursorError si no es válido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (ValueError, TypeError) as error:
+        raise CursorError('Cursor no válido') from error
+    if (not isinstance(key, list) or len(key) != size or
+            not all(isinstance(value, (str, int)) and not isinstance(value, bool) for value in key)):
+        raise CursorError('Cursor no válido')
+    return tuple(key)
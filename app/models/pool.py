@@ -0,0 +1,62 @@
+"""
+Pool de conexiones SQLite
+Mantiene un número acotado de conexiones abiertas para reutilizarlas entre peticiones
+"""
+
+import sqlite3
+import threading
+
+
+class ConnectionPool:
+    """Pool acotado de conexiones reutilizables."""
+
+    def __init__(self, factory, max_size=5, timeout=10.0):
+        self._factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def acquire(self):
+        """Obtiene una conexión libre (o abre una nueva si hay hueco)."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError(
+                f"No hay conexiones libres en el pool (máximo {self.max_size})"
+            )
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        try:
+            return self._factory()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection):
+        """Devuelve una conexión al pool."""
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except sqlite3.Error:
+            # Conexión rota: se descarta y se libera el hueco
+            self._close_quietly(connection)
+        else:
+            with self._lock:
+                self._idle.append(connection)
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        """Cierra las conexiones inactivas del pool."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._close_quietly(connection)
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except sqlite3.Error:
+            pass
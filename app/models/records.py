@@ -0,0 +1,235 @@
+"""
+Récords personales por usuario y ejercicio (tabla personal_records)
+Se actualizan al guardar series, de modo que consultar los récords o detectar uno nuevo
+es una lectura por clave primaria en lugar de recorrer todo el historial
+"""
+
+from app.models.database import Database
+from app.analytics.strength import e1rm_sql, estimate_1rm
+
+
+# Tipos de récord. weight_key es el peso para 'max_reps' (mejores repeticiones con ese
+# peso) y 0 para el resto.
+RECORD_TYPES = {
+    'max_weight': 'Peso máximo',
+    'max_reps': 'Repeticiones máximas con un peso',
+    'max_e1rm': '1RM estimado',
+    'max_volume': 'Volumen en una sesión',
+}
+
+# Series que cuentan para los récords (sin calentamientos)
+VALID_SET = "wset.weight_kg > 0 AND wset.reps > 0 AND COALESCE(wset.is_warmup, 0) = 0"
+
+_COLUMNS = ("user_id, exercise_id, record_type, weight_key, value, "
+            "weight_kg, reps, set_id, session_id, record_date")
+
+# Mejor serie de cada grupo; en empate cuenta la primera (como al guardar en orden)
+_RANKED_QUERY = """
+    INSERT INTO personal_records ({columns})
+    SELECT user_id, exercise_id, '{record_type}', weight_key, value,
+           weight_kg, reps, set_id, session_id, session_date
+    FROM (
+        SELECT ws.user_id, wset.exercise_id, {weight_key} AS weight_key, {value} AS value,
+               wset.weight_kg, wset.reps, wset.id AS set_id, ws.id AS session_id, ws.session_date,
+               ROW_NUMBER() OVER (
+                   PARTITION BY ws.user_id, wset.exercise_id, {weight_key}
+                   ORDER BY {value} DESC, ws.session_date, wset.id
+               ) AS position
+        FROM workout_sessions ws
+        JOIN workout_sets wset ON wset.session_id = ws.id
+        WHERE {valid} {user_filter}
+    )
+    WHERE position = 1
+"""
+
+_VOLUME_QUERY = """
+    INSERT INTO personal_records ({columns})
+    SELECT user_id, exercise_id, 'max_volume', 0, value,
+           NULL, NULL, NULL, session_id, session_date
+    FROM (
+        SELECT user_id, exercise_id, session_id, session_date, value,
+               ROW_NUMBER() OVER (
+                   PARTITION BY user_id, exercise_id ORDER BY value DESC, session_date, session_id
+               ) AS position
+        FROM (
+            SELECT ws.user_id, wset.exercise_id, ws.id AS session_id, ws.session_date,
+                   SUM(wset.weight_kg * wset.reps) AS value
+            FROM workout_sessions ws
+            JOIN workout_sets wset ON wset.session_id = ws.id
+            WHERE {valid} {user_filter}
+            GROUP BY ws.id, wset.exercise_id
+        )
+    )
+    WHERE position = 1
+"""
+
+
+def rebuild_personal_records(connection, user_id=None):
+    """Recalcula personal_records desde workout_sets (todos los usuarios o uno)."""
+    if user_id is None:
+        connection.execute("DELETE FROM personal_records")
+        user_filter, params = "", ()
+    else:
+        connection.execute("DELETE FROM personal_records WHERE user_id = ?", (user_id,))
+        user_filter, params = "AND ws.user_id = ?", (user_id,)
+
+    ranked = {
+        'max_weight': ('0', 'wset.weight_kg'),
+        'max_reps': ('wset.weight_kg', 'wset.reps'),
+        'max_e1rm': ('0', e1rm_sql('wset.weight_kg', 'wset.reps', 'wset.rpe')),
+    }
+    rows = 0
+    for record_type, (weight_key, value) in ranked.items():
+        rows += connection.execute(_RANKED_QUERY.format(
+            columns=_COLUMNS, record_type=record_type, weight_key=weight_key, value=value,
+            valid=VALID_SET, user_filter=user_filter
+        ), params).rowcount
+    rows += connection.execute(_VOLUME_QUERY.format(
+        columns=_COLUMNS, valid=VALID_SET, user_filter=user_filter
+    ), params).rowcount
+    return rows
+
+
+class PersonalRecord:
+    """Modelo para récords personales."""
+
+    def __init__(self, user_id=None, exercise_id=None, record_type=None, weight_key=0,
+                 value=None, weight_kg=None, reps=None, set_id=None, session_id=None,
+                 record_date=None):
+        self.user_id = user_id
+        self.exercise_id = exercise_id
+        self.record_type = record_type
+        self.weight_key = weight_key
+        self.value = value
+        self.weight_kg = weight_kg
+        self.reps = reps
+        self.set_id = set_id
+        self.session_id = session_id
+        self.record_date = record_date
+
+    @property
+    def key(self):
+        return (self.record_type, self.weight_key)
+
+    @classmethod
+    def get_by_exercise(cls, user_id, exercise_id):
+        """Récords de un ejercicio (una lectura por clave primaria)."""
+        query = """
+            SELECT * FROM personal_records
+            WHERE user_id = %s AND exercise_id = %s
+            ORDER BY record_type, weight_key
+        """
+        return [cls(**row) for row in Database.execute_query(query, (user_id, exercise_id))]
+
+    @classmethod
+    def get_by_user(cls, user_id):
+        """Récords principales de todos los ejercicios del usuario (sin los de repeticiones por peso)."""
+        query = """
+            SELECT pr.exercise_id, e.name AS exercise_name, pr.record_type,
+                   ROUND(pr.value, 2) AS value, pr.weight_kg, pr.reps,
+                   pr.set_id, pr.session_id, pr.record_date
+            FROM personal_records pr
+            JOIN exercises e ON e.id = pr.exercise_id
+            WHERE pr.user_id = %s AND pr.record_type != 'max_reps'
+            ORDER BY e.name, pr.record_type
+        """
+        return Database.execute_query(query, (user_id,))
+
+    @classmethod
+    def update_for_sets(cls, sets):
+        """
+        Actualiza los récords con series recién guardadas (debe llamarse dentro de la
+        transacción que las inserta). Devuelve los récords batidos, con el valor anterior.
+        """
+        candidates = [s for s in sets if estimate_1rm(s.weight_kg, s.reps) is not None and not s.is_warmup]
+        if not candidates:
+            return []
+        session_ids = sorted({s.session_id for s in candidates})
+        placeholders = ', '.join(['%s'] * len(session_ids))
+        sessions = {
+            row['id']: row for row in Database.execute_query(
+                f"SELECT id, user_id, session_date FROM workout_sessions WHERE id IN ({placeholders})",
+                tuple(session_ids)
+            )
+        }
+
+        groups = {}
+        for workout_set in candidates:
+            session = sessions.get(workout_set.session_id)
+            if session is not None:
+                groups.setdefault((session['user_id'], workout_set.exercise_id), []).append(workout_set)
+
+        broken = []
+        for (user_id, exercise_id), group in groups.items():
+            current = {record.key: record for record in cls.get_by_exercise(user_id, exercise_id)}
+            best = {}
+
+            def offer(record):
+                # Solo mejora si supera estrictamente al récord actual y a otras series del lote
+                previous = best.get(record.key) or current.get(record.key)
+                if previous is None or record.value > previous.value:
+                    best[record.key] = record
+
+            for workout_set in group:
+                session = sessions[workout_set.session_id]
+                base = dict(user_id=user_id, exercise_id=exercise_id, weight_kg=workout_set.weight_kg,
+                            reps=workout_set.reps, set_id=workout_set.id,
+                            session_id=workout_set.session_id, record_date=session['session_date'])
+                offer(cls(record_type='max_weight', value=workout_set.weight_kg, **base))
+                offer(cls(record_type='max_reps', weight_key=workout_set.weight_kg,
+                          value=workout_set.reps, **base))
+                offer(cls(record_type='max_e1rm',
+                          value=estimate_1rm(workout_set.weight_kg, workout_set.reps, workout_set.rpe),
+                          **base))
+
+            # Volumen de las sesiones tocadas (incluye las series guardadas antes en la misma sesión)
+            touched = sorted({s.session_id for s in group})
+            placeholders = ', '.join(['%s'] * len(touched))
+            volumes = Database.execute_query(f"""
+                SELECT wset.session_id, SUM(wset.weight_kg * wset.reps) AS value
+                FROM workout_sets wset
+                WHERE wset.exercise_id = %s AND wset.session_id IN ({placeholders}) AND {VALID_SET}
+                GROUP BY wset.session_id
+            """, (exercise_id, *touched))
+            for row in volumes:
+                offer(cls(user_id=user_id, exercise_id=exercise_id, record_type='max_volume',
+                          value=row['value'], session_id=row['session_id'],
+                          record_date=sessions[row['session_id']]['session_date']))
+
+            for record in best.values():
+                record.save()
+                previous = current.get(record.key)
+                broken.append(dict(record.to_dict(),
+                                   previous=round(previous.value, 2) if previous else None))
+        return broken
+
+    def save(self):
+        """Guarda el récord (sustituye al anterior del mismo tipo)."""
+        query = f"""
+            INSERT OR REPLACE INTO personal_records ({_COLUMNS})
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        Database.execute_insert(query, (
+            self.user_id, self.exercise_id, self.record_type, self.weight_key, self.value,
+            self.weight_kg, self.reps, self.set_id, self.session_id, str(self.record_date)
+        ))
+        return self
+
+    @classmethod
+    def rebuild(cls, user_id=None):
+        """Reconstruye la tabla completa (o la de un usuario). Devuelve las filas escritas."""
+        with Database.transaction() as connection:
+            Database.mark_written('personal_records')
+            return rebuild_personal_records(connection, user_id)
+
+    def to_dict(self):
+        return {
+            'exercise_id': self.exercise_id,
+            'record_type': self.record_type,
+            'value': round(self.value, 2) if self.value is not None else None,
+            'weight_kg': self.weight_kg,
+            'reps': self.reps,
+            'set_id': self.set_id,
+            'session_id': self.session_id,
+            'record_date': str(self.record_date) if self.record_date else None,
+        }
@@ -0,0 +1,138 @@
+"""
+Agregados diarios por usuario (tabla daily_metrics)
+Se actualizan en cada escritura y permiten leer las gráficas con un rango indexado
+Las columnas y sus cálculos salen del registro de métricas (app/models/metric_registry.py)
+"""
+
+from app.models.database import Database
+from app.models.metric_registry import SOURCES, DAILY_METRICS
+
+
+def _existing_columns(connection):
+    """Métricas cuya columna existe en la tabla (según las migraciones aplicadas)."""
+    present = {row[1] for row in connection.execute("PRAGMA table_info(daily_metrics)")}
+    return [metric for metric in DAILY_METRICS if metric.column in present]
+
+
+def _source_filter(source, scope):
+    """Condición sobre un origen según el alcance: 'day' (usuario y día), 'user' o 'all'."""
+    if scope == 'day':
+        return f"WHERE {source['user']} = ? AND {source['date']} = ?"
+    if scope == 'user':
+        return f"WHERE {source['user']} = ?"
+    return ""
+
+
+def _keys_sql(scope):
+    """Pares (user_id, day) a recalcular: uno concreto o todos los días con algún registro."""
+    if scope == 'day':
+        return "SELECT ? AS user_id, ? AS day"
+    return "\n            UNION ".join(
+        f"SELECT {source['user']} AS user_id, {source['date']} AS day "
+        f"FROM {source['from']} {_source_filter(source, scope)}"
+        for source in SOURCES.values()
+    )
+
+
+class RollupQuery:
+    """
+    INSERT OR REPLACE de daily_metrics para un alcance.
+    Cada tabla de origen se agrega una sola vez (GROUP BY usuario, día) con todas sus
+    métricas, y se une a las claves por (user_id, day).
+    """
+
+    def __init__(self, metrics, scope):
+        self.scope = scope
+        by_source = {}
+        for metric in metrics:
+            by_source.setdefault(metric.source, []).append(metric)
+
+        joins = []
+        values = []
+        for name, source_metrics in by_source.items():
+            source = SOURCES[name]
+            alias = f"s_{name}"
+            columns = ",\n                       ".join(
+                f"{metric.daily_sql()} AS {metric.column}" for metric in source_metrics
+            )
+            joins.append(f"""
+            LEFT JOIN (
+                SELECT {source['user']} AS user_id, {source['date']} AS day,
+                       {columns}
+                FROM {source['from']}
+                {_source_filter(source, scope)}
+                GROUP BY {source['user']}, {source['date']}
+            ) {alias} ON {alias}.user_id = k.user_id AND {alias}.day = k.day""")
+            values.extend(f"{alias}.{metric.column}" for metric in source_metrics)
+
+        self.sql = """
+            INSERT OR REPLACE INTO daily_metrics (user_id, metric_date, {names})
+            SELECT k.user_id, k.day, {values}
+            FROM ({keys}) k{joins}
+        """.format(
+            names=', '.join(metric.column for metric in metrics),
+            values=', '.join(values),
+            keys=_keys_sql(scope),
+            joins=''.join(joins),
+        )
+        # Cada filtro repite la clave: primero los de la lista de claves, después uno por JOIN
+        key_filters = 1 if scope == 'day' else len(SOURCES)
+        self._repeat = 0 if scope == 'all' else key_filters + len(by_source)
+
+    def params(self, *key):
+        """Parámetros para la clave (user_id, day), (user_id) o ()."""
+        return key * self._repeat
+
+
+def rebuild_daily_metrics(connection, user_id=None):
+    """Recalcula daily_metrics desde los registros (todos los usuarios o uno)."""
+    metrics = _existing_columns(connection)
+    if user_id is None:
+        connection.execute("DELETE FROM daily_metrics")
+        query = RollupQuery(metrics, 'all')
+        params = query.params()
+    else:
+        connection.execute("DELETE FROM daily_metrics WHERE user_id = ?", (user_id,))
+        query = RollupQuery(metrics, 'user')
+        params = query.params(user_id)
+    return connection.execute(query.sql, params).rowcount
+
+
+class DailyMetrics:
+    """Modelo para los agregados diarios de métricas."""
+
+    _refresh = RollupQuery(DAILY_METRICS, 'day')
+
+    @staticmethod
+    def _day(value):
+        """Normaliza una fecha (date o texto) a 'YYYY-MM-DD'."""
+        return str(value)[:10]
+
+    @classmethod
+    def refresh(cls, user_id, day):
+        """Recalcula la fila de un usuario y día."""
+        Database.execute_insert(cls._refresh.sql, cls._refresh.params(user_id, cls._day(day)))
+
+    @classmethod
+    def refresh_many(cls, keys):
+        """Recalcula varias filas (pares usuario, día) en una transacción."""
+        unique_keys = sorted({(user_id, cls._day(day)) for user_id, day in keys})
+        if unique_keys:
+            Database.execute_many(cls._refresh.sql, [cls._refresh.params(*key) for key in unique_keys])
+
+    @classmethod
+    def refresh_session(cls, session_id):
+        """Recalcula el día de una sesión de entrenamiento."""
+        row = Database.execute_query(
+            "SELECT user_id, session_date FROM workout_sessions WHERE id = %s",
+            (session_id,), fetch_one=True
+        )
+        if row:
+            cls.refresh(row['user_id'], row['session_date'])
+
+    @classmethod
+    def rebuild(cls, user_id=None):
+        """Reconstruye la tabla completa (o la de un usuario). Devuelve las filas escritas."""
+        with Database.transaction() as connection:
+            Database.mark_written('daily_metrics')
+            return rebuild_daily_metrics(connection, user_id)
@@ -0,0 +1,75 @@
+"""
+Perfiles de almacenamiento SQLite
+Agrupan los PRAGMA que se aplican a cada conexión
+"""
+
+
+STORAGE_PROFILES = {
+    # Journal clásico de SQLite: los lectores esperan a los escritores
+    'default': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'cache_size': -2000,          # KiB (negativo) o páginas (positivo)
+        'mmap_size': 0,
+        'busy_timeout': 5000,         # ms
+    },
+    # WAL: lectores concurrentes que nunca esperan al único escritor
+    'wal': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,
+        'mmap_size': 128 * 1024 * 1024,
+        'busy_timeout': 5000,
+    },
+}
+
+_SYNCHRONOUS_VALUES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+class StorageProfile:
+    """Configuración de PRAGMA para lectores y escritor."""
+
+    def __init__(self, journal_mode='WAL', synchronous='NORMAL', cache_size=-16000,
+                 mmap_size=0, busy_timeout=5000):
+        synchronous = str(synchronous).upper()
+        if synchronous not in _SYNCHRONOUS_VALUES:
+            raise ValueError(f"Valor de synchronous no válido: {synchronous}")
+        self.journal_mode = str(journal_mode).upper()
+        self.synchronous = synchronous
+        self.cache_size = int(cache_size)
+        self.mmap_size = int(mmap_size)
+        self.busy_timeout = int(busy_timeout)
+
+    @classmethod
+    def get(cls, name, **overrides):
+        """Crea un perfil a partir de su nombre, con valores sobrescritos opcionales."""
+        if name not in STORAGE_PROFILES:
+            raise ValueError(f"Perfil de almacenamiento desconocido: {name}")
+        settings = dict(STORAGE_PROFILES[name])
+        settings.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**settings)
+
+    @classmethod
+    def from_config(cls, config):
+        """Crea el perfil a partir de la configuración de Flask."""
+        return cls.get(
+            config.get('DB_STORAGE_PROFILE', 'wal'),
+            synchronous=config.get('DB_SYNCHRONOUS'),
+            cache_size=config.get('DB_CACHE_SIZE'),
+            mmap_size=config.get('DB_MMAP_SIZE'),
+            busy_timeout=config.get('DB_BUSY_TIMEOUT'),
+        )
+
+    @property
+    def is_wal(self):
+        return self.journal_mode == 'WAL'
+
+    def apply(self, connection, writer=False):
+        """Aplica los PRAGMA a una conexión."""
+        connection.execute(f"PRAGMA busy_timeout = {self.busy_timeout}")
+        connection.execute(f"PRAGMA cache_size = {self.cache_size}")
+        connection.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+        if writer:
+            # journal_mode es persistente en el fichero; solo lo fija el escritor
+            connection.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+            connection.execute(f"PRAGMA synchronous = {self.synchronous}")
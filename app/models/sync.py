@@ -0,0 +1,207 @@
+"""
+Sincronización de entrenamientos registrados sin conexión
+El cliente guarda las operaciones en una cola local y las envía juntas con una clave de
+idempotencia cada una; reenviar una operación ya aplicada devuelve el resultado guardado
+en lugar de repetir la escritura.
+"""
+
+import json
+import sqlite3
+from datetime import date, datetime
+from app.models.database import Database
+from app.models.workout import Exercise, WorkoutSession, WorkoutSet
+
+
+# Días que se conservan las claves de idempotencia
+RETENTION_DAYS = 30
+
+MAX_KEY_LENGTH = 100
+
+
+class SyncError(ValueError):
+    """Operación no válida: se rechaza sin aplicarla."""
+
+
+class SyncOperation:
+    """Modelo para las operaciones sincronizadas (tabla sync_operations)."""
+
+    TYPES = ('start_session', 'add_set', 'end_session')
+
+    @classmethod
+    def apply(cls, user_id, operations):
+        """
+        Aplica una lista de operaciones en una sola transacción.
+        Cada operación: {"key": ..., "type": start_session | add_set | end_session, ...}.
+        Las series y sesiones se refieren a su sesión con session_id o con session_key
+        (la clave de la operación start_session, del mismo envío o de uno anterior).
+        Devuelve un resultado por operación con status applied, duplicate o error.
+        """
+        results = []
+        applied = {}        # clave -> resultado, de este envío
+        pending_sets = []   # (posición, clave, serie): se guardan todas juntas al final
+        duplicates = []     # (posición, clave) repetidas dentro del envío
+        with Database.transaction():
+            Database.execute_update(
+                "DELETE FROM sync_operations WHERE user_id = %s AND created_at < datetime('now', %s)",
+                (user_id, f'-{RETENTION_DAYS} days')
+            )
+            # Ejercicios de las series del envío, comprobados con una sola consulta
+            exercises = Exercise.existing_ids(
+                operation['exercise_id'] for operation in operations
+                if isinstance(operation, dict) and operation.get('type') == 'add_set'
+                and isinstance(operation.get('exercise_id'), (int, str))
+            )
+            for operation in operations:
+                key = operation.get('key') if isinstance(operation, dict) else None
+                if not isinstance(key, str) or not 0 < len(key) <= MAX_KEY_LENGTH:
+                    results.append({'key': None, 'status': 'error',
+                                    'error': f'key obligatoria (máximo {MAX_KEY_LENGTH} caracteres)'})
+                    continue
+                if key in applied:
+                    duplicates.append((len(results), key))
+                    results.append(None)
+                    continue
+                try:
+                    stored = cls._stored_result(user_id, key)
+                    if stored is not None:
+                        results.append({'key': key, 'status': 'duplicate', **stored})
+                        continue
+                    if operation.get('type') == 'add_set':
+                        workout_set = cls._build_set(user_id, operation, applied, exercises)
+                        pending_sets.append((len(results), key, workout_set))
+                        applied[key] = None
+                        results.append(None)
+                        continue
+                    # Una restricción incumplida deshace solo esta operación
+                    with Database.savepoint('sync_operation'):
+                        result = cls._apply_one(user_id, operation, applied)
+                except SyncError as e:
+                    results.append({'key': key, 'status': 'error', 'error': str(e)})
+                    continue
+                except sqlite3.IntegrityError as e:
+                    results.append({'key': key, 'status': 'error', 'error': f'Referencia no válida ({e})'})
+                    continue
+                cls._store(user_id, key, operation['type'], result)
+                applied[key] = result
+                results.append({'key': key, 'status': 'applied', **result})
+
+            errors = cls._save_sets(pending_sets)
+            for position, key, workout_set in pending_sets:
+                if key in errors:
+                    del applied[key]
+                    results[position] = {'key': key, 'status': 'error', 'error': errors[key]}
+                    continue
+                result = {'set_id': workout_set.id, 'session_id': workout_set.session_id}
+                if workout_set.new_records:
+                    result['new_records'] = workout_set.new_records
+                cls._store(user_id, key, 'add_set', result)
+                applied[key] = result
+                results[position] = {'key': key, 'status': 'applied', **result}
+            for position, key in duplicates:
+                if key in errors:
+                    results[position] = {'key': key, 'status': 'error', 'error': errors[key]}
+                else:
+                    results[position] = {'key': key, 'status': 'duplicate', **applied[key]}
+        return results
+
+    @classmethod
+    def _save_sets(cls, pending_sets):
+        """
+        Guarda las series juntas. Si el lote incumple alguna restricción se guardan una a una
+        para rechazar solo las que fallan. Devuelve {clave: error}.
+        """
+        try:
+            with Database.savepoint('sync_sets'):
+                WorkoutSet.save_many([workout_set for _, _, workout_set in pending_sets])
+            return {}
+        except sqlite3.IntegrityError:
+            pass
+        errors = {}
+        for _, key, workout_set in pending_sets:
+            workout_set.id = None
+            workout_set.new_records = []
+            try:
+                with Database.savepoint('sync_set'):
+                    workout_set.save()
+            except sqlite3.IntegrityError as e:
+                workout_set.id = None
+                errors[key] = f'Referencia no válida ({e})'
+        return errors
+
+    @classmethod
+    def _apply_one(cls, user_id, operation, applied):
+        if operation.get('type') == 'start_session':
+            workout_session = WorkoutSession(
+                user_id=user_id,
+                training_day_id=operation.get('training_day_id'),
+                session_date=cls._date(operation.get('session_date')),
+                start_time=cls._time(operation.get('start_time')) or datetime.now().time(),
+                notes=operation.get('notes')
+            )
+            workout_session.save()
+            return {'session_id': workout_session.id}
+        if operation.get('type') == 'end_session':
+            session_id = cls._session_id(user_id, operation, applied)
+            WorkoutSession.end(session_id, cls._time(operation.get('end_time')))
+            return {'session_id': session_id}
+        raise SyncError(f"type debe ser uno de: {', '.join(cls.TYPES)}")
+
+    @classmethod
+    def _build_set(cls, user_id, operation, applied, exercises):
+        try:
+            workout_set = WorkoutSet.from_dict(None, operation)
+        except ValueError as e:
+            raise SyncError(str(e))
+        if workout_set.exercise_id not in exercises:
+            raise SyncError(f'Ejercicio {workout_set.exercise_id} no encontrado')
+        workout_set.session_id = cls._session_id(user_id, operation, applied)
+        return workout_set
+
+    @classmethod
+    def _session_id(cls, user_id, operation, applied):
+        """Sesión de la operación (por id o por la clave de su start_session), del usuario."""
+        session_id = operation.get('session_id')
+        session_key = operation.get('session_key')
+        if session_id is None and session_key is not None:
+            started = applied.get(session_key) or cls._stored_result(user_id, session_key) or {}
+            session_id = started.get('session_id')
+        workout_session = None
+        if session_id is not None:
+            workout_session = WorkoutSession.get_for_user(session_id, user_id)
+        if workout_session is None:
+            raise SyncError('Sesión no encontrada')
+        return workout_session.id
+
+    @classmethod
+    def _stored_result(cls, user_id, key):
+        row = Database.execute_query(
+            "SELECT result FROM sync_operations WHERE user_id = %s AND idempotency_key = %s",
+            (user_id, key), fetch_one=True
+        )
+        return json.loads(row['result']) if row else None
+
+    @classmethod
+    def _store(cls, user_id, key, operation_type, result):
+        Database.execute_insert(
+            "INSERT INTO sync_operations (user_id, idempotency_key, operation, result) "
+            "VALUES (%s, %s, %s, %s)",
+            (user_id, key, operation_type, json.dumps(result))
+        )
+
+    @staticmethod
+    def _date(value):
+        if value is None:
+            return date.today()
+        try:
+            return date.fromisoformat(str(value)[:10])
+        except ValueError:
+            raise SyncError('Fecha no válida (YYYY-MM-DD)')
+
+    @staticmethod
+    def _time(value):
+        if value is None:
+            return None
+        try:
+            return datetime.strptime(str(value)[:8], '%H:%M:%S').time()
+        except ValueError:
+            raise SyncError('Hora no válida (HH:MM:SS)')
@@ -0,0 +1,92 @@
+"""
+Versiones de los datos por usuario y tabla
+Permiten generar ETags y responder 304 sin ejecutar consultas
+"""
+
+import hashlib
+import threading
+import uuid
+from datetime import date
+from functools import wraps
+from flask import has_request_context, session, request, current_app
+
+
+class DataVersions:
+    """
+    Contadores en memoria que aumentan con cada escritura confirmada.
+    Un nonce de arranque evita reutilizar ETags de una ejecución anterior
+    (los contadores empiezan de cero en cada proceso). Las escrituras de otros
+    procesos (seed_data.py, flask rebuild-*) entran con Database.external_version().
+    """
+
+    def __init__(self):
+        self.nonce = uuid.uuid4().hex
+        self._global = {}   # tabla -> escrituras de este proceso fuera de una petición
+        self._by_user = {}  # (user_id, tabla) -> escrituras del usuario
+        self._lock = threading.Lock()
+        self._database = None
+
+    def init_app(self, database):
+        """Se suscribe a las escrituras de la base de datos."""
+        self._database = database
+        database.add_write_listener(self.on_write)
+
+    def bump(self, tables, user_id=None):
+        """Incrementa la versión de las tablas (de un usuario o de todos)."""
+        with self._lock:
+            for table in tables:
+                if user_id is None:
+                    self._global[table] = self._global.get(table, 0) + 1
+                else:
+                    key = (user_id, table)
+                    self._by_user[key] = self._by_user.get(key, 0) + 1
+
+    def get(self, user_id, tables):
+        """Versión actual de cada tabla para un usuario."""
+        with self._lock:
+            return tuple(
+                (table, self._global.get(table, 0), self._by_user.get((user_id, table), 0))
+                for table in sorted(tables)
+            )
+
+    def on_write(self, tables):
+        """Listener de Database: cada usuario escribe sus propios datos."""
+        user_id = session.get('user_id') if has_request_context() else None
+        self.bump(tables, user_id)
+
+    def etag(self, user_id, tables, *parts):
+        """ETag a partir de las versiones de las tablas y de los datos de la petición."""
+        external = self._database.external_version() if self._database else 0
+        key = repr((self.nonce, external, user_id, self.get(user_id, tables), parts))
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+data_versions = DataVersions()
+
+
+def conditional_get(*tables):
+    """
+    Decorador para vistas GET que devuelven JSON y solo leen de `tables`.
+    Si el ETag del cliente coincide se responde 304 sin ejecutar la vista.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Incluye el día actual: muchas vistas usan rangos relativos a hoy
+            etag = data_versions.etag(
+                session.get('user_id', 1), tables,
+                request.full_path, date.today().isoformat(),
+                request.headers.get('Accept', '')
+            )
+            if etag in request.if_none_match:
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            # El navegador guarda la respuesta pero la revalida siempre
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
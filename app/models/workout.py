@@ -2,7 +2,12 @@
 Modelos de Entrenamiento
 """
 
+import math
+from datetime import datetime
 from app.models.database import Database
+from app.models.rollup import DailyMetrics
+from app.models.records import PersonalRecord
+from app.models.pagination import encode_cursor, decode_cursor
 
 
 class Exercise:
@@ -51,7 +56,33 @@ class Exercise:
         if result:
             return cls(**result)
         return None
-    
+
+    @classmethod
+    def existing_ids(cls, exercise_ids):
+        """Los ids de la lista que corresponden a un ejercicio (una sola consulta)."""
+        exercise_ids = list(set(exercise_ids))
+        if not exercise_ids:
+            return set()
+        placeholders = ', '.join(['%s'] * len(exercise_ids))
+        query = f"SELECT id FROM exercises WHERE id IN ({placeholders})"
+        return {row['id'] for row in Database.execute_query(query, tuple(exercise_ids))}
+
+    @classmethod
+    def get_logged(cls, user_id):
+        """Ejercicios con al menos una serie registrada por el usuario."""
+        query = """
+            SELECT * FROM exercises
+            WHERE id IN (
+                SELECT DISTINCT wset.exercise_id
+                FROM workout_sessions ws
+                JOIN workout_sets wset ON wset.session_id = ws.id
+                WHERE ws.user_id = %s
+            )
+            ORDER BY muscle_group, name
+        """
+        results = Database.execute_query(query, (user_id,))
+        return [cls(**row) for row in results]
+
     @classmethod
     def get_by_muscle_group(cls, muscle_group, user_id=None):
         """Obtiene ejercicios por grupo muscular."""
@@ -86,6 +117,7 @@ class TrainingPlan:
         self.is_active = is_active
         self.created_at = created_at
         self.updated_at = updated_at
+        self._days = None  # Días precargados por load_tree()
     
     def save(self):
         """Guarda el plan de entrenamiento."""
@@ -122,8 +154,61 @@ class TrainingPlan:
             return cls(**result)
         return None
     
+    @classmethod
+    def load_tree(cls, user_id, plan_id=None):
+        """
+        Carga los planes del usuario con sus días y ejercicios planificados
+        en tres consultas, sea cual sea el tamaño de los planes.
+        """
+        plan_filter = "" if plan_id is None else " AND tp.id = %s"
+        params = (user_id,) if plan_id is None else (user_id, plan_id)
+        
+        plan_rows = Database.execute_query(
+            "SELECT tp.* FROM training_plans tp WHERE tp.user_id = %s" + plan_filter +
+            " ORDER BY tp.created_at DESC", params)
+        if not plan_rows:
+            return []
+        
+        day_rows = Database.execute_query("""
+            SELECT td.*
+            FROM training_days td
+            JOIN training_plans tp ON td.plan_id = tp.id
+            WHERE tp.user_id = %s""" + plan_filter + """
+            ORDER BY td.plan_id, td.day_of_week
+        """, params)
+        
+        exercise_rows = Database.execute_query("""
+            SELECT pe.*, e.name as exercise_name, e.muscle_group
+            FROM planned_exercises pe
+            JOIN training_days td ON pe.training_day_id = td.id
+            JOIN training_plans tp ON td.plan_id = tp.id
+            JOIN exercises e ON pe.exercise_id = e.id
+            WHERE tp.user_id = %s""" + plan_filter + """
+            ORDER BY pe.training_day_id, pe.order_index
+        """, params)
+        
+        # Montar el árbol en memoria
+        plans = [cls(**row) for row in plan_rows]
+        plans_by_id = {plan.id: plan for plan in plans}
+        for plan in plans:
+            plan._days = []
+        
+        days_by_id = {}
+        for row in day_rows:
+            day = TrainingDay(**row)
+            day._exercises = []
+            days_by_id[day.id] = day
+            plans_by_id[day.plan_id]._days.append(day)
+        
+        for row in exercise_rows:
+            days_by_id[row['training_day_id']]._exercises.append(row)
+        
+        return plans
+    
     def get_days(self):
         """Obtiene los días del plan."""
+        if self._days is not None:
+            return self._days
         return TrainingDay.get_by_plan(self.id)
     
     def to_dict(self):
@@ -145,6 +230,7 @@ class TrainingDay:
         self.plan_id = plan_id
         self.day_of_week = day_of_week
         self.name = name
+        self._exercises = None  # Ejercicios precargados por TrainingPlan.load_tree()
     
     def save(self):
         """Guarda el día de entrenamiento."""
@@ -165,7 +251,9 @@ class TrainingDay:
         return [cls(**row) for row in results]
     
     def get_exercises(self):
-        """Obtiene los ejercicios planificados del día."""
+        """Obtiene los ejercicios planificados del día (con nombre y grupo muscular)."""
+        if self._exercises is not None:
+            return self._exercises
         return PlannedExercise.get_by_day(self.id)
     
     def to_dict(self):
@@ -174,7 +262,7 @@ class TrainingDay:
             'plan_id': self.plan_id,
             'day_of_week': self.day_of_week,
             'name': self.name,
-            'exercises': [ex.to_dict() for ex in self.get_exercises()]
+            'exercises': self.get_exercises()
         }
 
 
@@ -257,20 +345,56 @@ class WorkoutSession:
             end_str = str(self.end_time) if self.end_time else None
             params = (self.user_id, self.training_day_id, self.session_date,
                      start_str, end_str, self.notes)
-            self.id = Database.execute_insert(query, params)
+            with Database.transaction():
+                self.id = Database.execute_insert(query, params)
+                if end_str:
+                    DailyMetrics.refresh(self.user_id, self.session_date)
         return self
     
     @classmethod
-    def get_by_user(cls, user_id, limit=10):
-        """Obtiene sesiones de un usuario."""
-        query = """
+    def end(cls, session_id, end_time=None):
+        """Finaliza una sesión (hora de fin) y actualiza sus agregados."""
+        end_time = end_time or datetime.now().time()
+        query = "UPDATE workout_sessions SET end_time = %s WHERE id = %s"
+        with Database.transaction():
+            updated = Database.execute_update(query, (str(end_time), session_id))
+            DailyMetrics.refresh_session(session_id)
+        return updated
+    
+    @classmethod
+    def get_by_user(cls, user_id, limit=10, cursor=None):
+        """
+        Sesiones de un usuario, de la más reciente a la más antigua, paginadas por la
+        clave (session_date, id). `cursor` es el de la página anterior.
+        Devuelve (sesiones, cursor de la página siguiente o None).
+        """
+        after, params = "", (user_id,)
+        if cursor:
+            after = "AND (session_date, id) < (%s, %s)"
+            params += decode_cursor(cursor, 2)
+        query = f"""
             SELECT * FROM workout_sessions 
-            WHERE user_id = %s 
-            ORDER BY session_date DESC, start_time DESC
+            WHERE user_id = %s {after}
+            ORDER BY session_date DESC, id DESC
             LIMIT %s
         """
-        results = Database.execute_query(query, (user_id, limit))
-        return [cls(**row) for row in results]
+        # Una fila de más para saber si hay página siguiente
+        results = Database.execute_query(query, (*params, limit + 1))
+        sessions = [cls(**row) for row in results[:limit]]
+        next_cursor = None
+        if len(results) > limit:
+            last = sessions[-1]
+            next_cursor = encode_cursor(str(last.session_date), last.id)
+        return sessions, next_cursor
+    
+    @classmethod
+    def get_for_user(cls, session_id, user_id):
+        """Sesión por id si pertenece al usuario; None si no existe o es de otro."""
+        query = "SELECT * FROM workout_sessions WHERE id = %s AND user_id = %s"
+        result = Database.execute_query(query, (session_id, user_id), fetch_one=True)
+        if result:
+            return cls(**result)
+        return None
     
     @classmethod
     def get_latest(cls, user_id):
@@ -302,6 +426,38 @@ class WorkoutSession:
         }
 
 
+def _number(data, field, kind):
+    """Campo numérico de un dict convertido a `kind` (None si falta); ValueError si no vale."""
+    value = data.get(field)
+    if value is None or value == '':
+        return None
+    try:
+        if isinstance(value, bool):
+            raise ValueError
+        number = float(value)
+        if not math.isfinite(number) or (kind is int and not number.is_integer()):
+            raise ValueError
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} debe ser un número' + (' entero' if kind is int else ''))
+    return kind(number)
+
+
+def _flag(data, field):
+    """Campo booleano de un dict (true/false, 1/0 o su texto); ValueError si no vale."""
+    value = data.get(field)
+    if value is None or value == '':
+        return False
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ('true', '1'):
+            return True
+        if value in ('false', '0'):
+            return False
+    elif value in (True, False):  # también 1 y 0
+        return bool(value)
+    raise ValueError(f'{field} debe ser true o false')
+
+
 class WorkoutSet:
     """Modelo para series de entrenamiento."""
     
@@ -318,20 +474,68 @@ class WorkoutSet:
         self.is_warmup = is_warmup
         self.notes = notes
         self.created_at = created_at
+        self.new_records = []  # récords batidos al guardar
+    
+    _insert_query = """
+        INSERT INTO workout_sets 
+        (session_id, exercise_id, set_number, weight_kg, reps, rpe, is_warmup, notes)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    
+    @classmethod
+    def from_dict(cls, session_id, data):
+        """
+        Serie a partir del JSON de la API o de la sincronización. Los números y is_warmup pueden
+        llegar como texto ("100", "false"); ValueError si falta exercise_id o set_number o un
+        campo no vale.
+        """
+        if not isinstance(data, dict) or data.get('exercise_id') is None or data.get('set_number') is None:
+            raise ValueError('exercise_id y set_number son obligatorios')
+        return cls(
+            session_id=session_id,
+            exercise_id=_number(data, 'exercise_id', int),
+            set_number=_number(data, 'set_number', int),
+            weight_kg=_number(data, 'weight_kg', float),
+            reps=_number(data, 'reps', int),
+            rpe=_number(data, 'rpe', float),
+            is_warmup=_flag(data, 'is_warmup'),
+            notes=data.get('notes')
+        )
+    
+    def _insert_params(self):
+        return (self.session_id, self.exercise_id, self.set_number,
+                self.weight_kg, self.reps, self.rpe, self.is_warmup, self.notes)
     
     def save(self):
         """Guarda la serie."""
         if self.id is None:
-            query = """
-                INSERT INTO workout_sets 
-                (session_id, exercise_id, set_number, weight_kg, reps, rpe, is_warmup, notes)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            params = (self.session_id, self.exercise_id, self.set_number,
-                     self.weight_kg, self.reps, self.rpe, self.is_warmup, self.notes)
-            self.id = Database.execute_insert(query, params)
+            with Database.transaction():
+                self.id = Database.execute_insert(self._insert_query, self._insert_params())
+                DailyMetrics.refresh_session(self.session_id)
+                self.new_records = PersonalRecord.update_for_sets([self])
         return self
     
+    @classmethod
+    def save_many(cls, sets):
+        """
+        Guarda varias series nuevas en una sola transacción.
+        Los récords batidos quedan en `new_records` de la serie que los batió
+        (los de volumen de sesión, en la última serie del lote).
+        """
+        new_sets = [s for s in sets if s.id is None]
+        with Database.transaction():
+            ids = Database.execute_many(cls._insert_query, [s._insert_params() for s in new_sets])
+            for workout_set, set_id in zip(new_sets, ids):
+                workout_set.id = set_id
+            for session_id in {s.session_id for s in new_sets}:
+                DailyMetrics.refresh_session(session_id)
+            records = PersonalRecord.update_for_sets(new_sets)
+        by_set = {s.id: s for s in new_sets}
+        for record in records:
+            owner = by_set.get(record['set_id']) or new_sets[-1]
+            owner.new_records.append(record)
+        return sets
+    
     @classmethod
     def get_by_session(cls, session_id):
         """Obtiene series de una sesión."""
@@ -345,17 +549,40 @@ class WorkoutSet:
         return Database.execute_query(query, (session_id,))
     
     @classmethod
-    def get_exercise_history(cls, user_id, exercise_id, limit=20):
-        """Obtiene historial de un ejercicio."""
-        query = """
+    def get_exercise_history(cls, user_id, exercise_id, limit=20, cursor=None):
+        """
+        Series de un ejercicio, de la sesión más reciente a la más antigua (dentro de cada
+        sesión, por número de serie). Se pagina por la clave (session_date, id) de la sesión
+        más la posición de la serie, así que una sesión puede repartirse entre dos páginas.
+        Devuelve (series, cursor de la página siguiente o None).
+        """
+        after, params = "", (user_id, exercise_id)
+        if cursor:
+            session_date, session_id, set_number, set_id = decode_cursor(cursor, 4)
+            # El rango (<=) lo resuelve el índice; el NOT descarta lo ya servido de esa sesión
+            after = """
+                AND (wss.session_date, wss.id) <= (%s, %s)
+                AND NOT (wss.id = %s AND (ws.set_number, ws.id) <= (%s, %s))
+            """
+            params += (session_date, session_id, session_id, set_number, set_id)
+        # CROSS JOIN fija el orden en SQLite: recorrer las sesiones por el índice de la clave
+        # (sin ordenar al final) y buscar en cada una las series del ejercicio
+        query = f"""
             SELECT ws.*, wss.session_date
-            FROM workout_sets ws
-            JOIN workout_sessions wss ON ws.session_id = wss.id
-            WHERE wss.user_id = %s AND ws.exercise_id = %s
-            ORDER BY wss.session_date DESC, ws.set_number
+            FROM workout_sessions wss
+            CROSS JOIN workout_sets ws ON ws.session_id = wss.id
+            WHERE wss.user_id = %s AND ws.exercise_id = %s {after}
+            ORDER BY wss.session_date DESC, wss.id DESC, ws.set_number, ws.id
             LIMIT %s
         """
-        return Database.execute_query(query, (user_id, exercise_id, limit))
+        results = Database.execute_query(query, (*params, limit + 1))
+        history = results[:limit]
+        next_cursor = None
+        if len(results) > limit:
+            last = history[-1]
+            next_cursor = encode_cursor(str(last['session_date']), last['session_id'],
+                                        last['set_number'], last['id'])
+        return history, next_cursor
     
     def to_dict(self):
         return {
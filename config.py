@@ -13,6 +13,26 @@ class Config:
     
     # SQLite - Base de datos local (no requiere configuración externa)
     # La base de datos se crea automáticamente en la carpeta 'data/'
+    
+    # Pool de conexiones: máximo de conexiones abiertas y espera máxima (segundos)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+    
+    # Perfil de almacenamiento: 'wal' (lectores concurrentes + un escritor) o 'default'
+    DB_STORAGE_PROFILE = os.environ.get('DB_STORAGE_PROFILE', 'wal')
+    # Ajustes opcionales del perfil (None = valor del perfil)
+    DB_SYNCHRONOUS = os.environ.get('DB_SYNCHRONOUS')
+    DB_CACHE_SIZE = os.environ.get('DB_CACHE_SIZE')
+    DB_MMAP_SIZE = os.environ.get('DB_MMAP_SIZE')
+    DB_BUSY_TIMEOUT = os.environ.get('DB_BUSY_TIMEOUT')
+    
+    # Consultas por encima de este umbral (ms) se registran con su EXPLAIN QUERY PLAN
+    DB_SLOW_QUERY_MS = float(os.environ.get('DB_SLOW_QUERY_MS', 100))
+    # Fichero opcional para el log de consultas lentas (por defecto, stderr)
+    DB_SLOW_QUERY_LOG = os.environ.get('DB_SLOW_QUERY_LOG')
+    
+    # Caché de respuestas de gráficas (nº máximo de respuestas; 0 la desactiva)
+    CHART_CACHE_SIZE = int(os.environ.get('CHART_CACHE_SIZE', 256))
 
 
 class DevelopmentConfig(Config):
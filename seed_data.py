@@ -1,34 +1,29 @@
 #!/usr/bin/env python3
 """
 Script para rellenar la base de datos con datos semi-realistas
+Todo se escribe en una sola transacción (un solo commit) con los métodos por lotes de Database
 """
 
-import sqlite3
 import random
 from datetime import date, timedelta
+from app.models.database import Database
+from app.models.rollup import rebuild_daily_metrics
+from app.models.records import rebuild_personal_records
 
-DB_PATH = 'data/gymgraph.db'
-
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def clear_all_data(conn):
+def clear_all_data():
     """Borra todos los datos de la base de datos."""
-    cursor = conn.cursor()
     tables = [
         'workout_sets', 'workout_sessions', 'planned_exercises', 
         'training_days', 'training_plans', 'food_logs', 'water_logs',
         'menstrual_logs', 'step_logs', 'sleep_logs', 'body_measurements',
-        'nutrition_goals', 'foods', 'exercises'
+        'nutrition_goals', 'foods', 'exercises', 'daily_metrics',
+        'personal_records'
     ]
     for table in tables:
-        cursor.execute(f"DELETE FROM {table}")
-    conn.commit()
+        Database.execute_update(f"DELETE FROM {table}")
     print("🗑️  Todos los datos borrados")
 
-def seed_foods(conn):
+def seed_foods():
     """Inserta alimentos comunes."""
     foods = [
         # Proteínas
@@ -105,17 +100,14 @@ def seed_foods(conn):
         ('Bowl de poke', None, 350, 'g', 450, 30, 50, 12, 3),
     ]
     
-    cursor = conn.cursor()
-    for food in foods:
-        cursor.execute("""
-            INSERT OR IGNORE INTO foods 
-            (name, brand, serving_size, serving_unit, calories, protein_g, carbs_g, fat_g, fiber_g, created_by, is_custom)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, 0)
-        """, food)
-    conn.commit()
+    Database.execute_many("""
+        INSERT OR IGNORE INTO foods 
+        (name, brand, serving_size, serving_unit, calories, protein_g, carbs_g, fat_g, fiber_g, created_by, is_custom)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 1, 0)
+    """, foods)
     print(f"✓ Insertados {len(foods)} alimentos")
 
-def seed_exercises(conn):
+def seed_exercises():
     """Inserta ejercicios comunes."""
     exercises = [
         # Pecho
@@ -187,19 +179,15 @@ def seed_exercises(conn):
         ('Saltar comba', 'Jump rope', 'cardio', 'bodyweight'),
     ]
     
-    cursor = conn.cursor()
-    for ex in exercises:
-        cursor.execute("""
-            INSERT OR IGNORE INTO exercises 
-            (name, description, muscle_group, equipment, created_by, is_custom)
-            VALUES (?, ?, ?, ?, NULL, 0)
-        """, ex)
-    conn.commit()
+    Database.execute_many("""
+        INSERT OR IGNORE INTO exercises 
+        (name, description, muscle_group, equipment, created_by, is_custom)
+        VALUES (%s, %s, %s, %s, NULL, 0)
+    """, exercises)
     print(f"✓ Insertados {len(exercises)} ejercicios")
 
-def seed_measurements(conn):
+def seed_measurements():
     """Inserta medidas corporales de todo el año."""
-    cursor = conn.cursor()
     today = date.today()
     
     # Simular progreso anual: empezar con más peso y grasa, ir bajando
@@ -230,20 +218,17 @@ def seed_measurements(conn):
             round(60.5 - progress * 3 + random.uniform(-0.3, 0.3), 1), # thigh_right
         ))
     
-    for m in measurements:
-        cursor.execute("""
-            INSERT INTO body_measurements 
-            (user_id, measurement_date, weight_kg, body_fat_percentage,
-             chest_cm, waist_cm, hips_cm, bicep_left_cm, bicep_right_cm,
-             thigh_left_cm, thigh_right_cm)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, m)
-    conn.commit()
+    Database.execute_many("""
+        INSERT INTO body_measurements 
+        (user_id, measurement_date, weight_kg, body_fat_percentage,
+         chest_cm, waist_cm, hips_cm, bicep_left_cm, bicep_right_cm,
+         thigh_left_cm, thigh_right_cm)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, measurements)
     print(f"✓ Insertadas {len(measurements)} mediciones corporales (1 año)")
 
-def seed_sleep_logs(conn):
+def seed_sleep_logs():
     """Inserta registros de sueño de todo el año."""
-    cursor = conn.cursor()
     today = date.today()
     
     logs = []
@@ -267,17 +252,14 @@ def seed_sleep_logs(conn):
         
         logs.append((1, d.isoformat(), round(hours, 1), quality))
     
-    for log in logs:
-        cursor.execute("""
-            INSERT INTO sleep_logs (user_id, log_date, hours_slept, sleep_quality)
-            VALUES (?, ?, ?, ?)
-        """, log)
-    conn.commit()
+    Database.execute_many("""
+        INSERT INTO sleep_logs (user_id, log_date, hours_slept, sleep_quality)
+        VALUES (%s, %s, %s, %s)
+    """, logs)
     print(f"✓ Insertados {len(logs)} registros de sueño (1 año)")
 
-def seed_step_logs(conn):
+def seed_step_logs():
     """Inserta registros de pasos de todo el año."""
-    cursor = conn.cursor()
     today = date.today()
     
     logs = []
@@ -300,17 +282,14 @@ def seed_step_logs(conn):
         
         logs.append((1, d.isoformat(), steps))
     
-    for log in logs:
-        cursor.execute("""
-            INSERT INTO step_logs (user_id, log_date, steps)
-            VALUES (?, ?, ?)
-        """, log)
-    conn.commit()
+    Database.execute_many("""
+        INSERT INTO step_logs (user_id, log_date, steps)
+        VALUES (%s, %s, %s)
+    """, logs)
     print(f"✓ Insertados {len(logs)} registros de pasos (1 año)")
 
-def seed_menstrual_logs(conn):
+def seed_menstrual_logs():
     """Inserta registros de ciclo menstrual de todo el año."""
-    cursor = conn.cursor()
     today = date.today()
     
     logs = []
@@ -339,33 +318,28 @@ def seed_menstrual_logs(conn):
                     intensity = 'light'
                 logs.append((1, d.isoformat(), 1, intensity))
     
-    for log in logs:
-        cursor.execute("""
-            INSERT INTO menstrual_logs (user_id, log_date, is_period_day, flow_intensity)
-            VALUES (?, ?, ?, ?)
-        """, log)
-    conn.commit()
+    Database.execute_many("""
+        INSERT INTO menstrual_logs (user_id, log_date, is_period_day, flow_intensity)
+        VALUES (%s, %s, %s, %s)
+    """, logs)
     print(f"✓ Insertados {len(logs)} registros menstruales (1 año)")
 
-def seed_nutrition_goals(conn):
+def seed_nutrition_goals():
     """Inserta objetivos nutricionales."""
-    cursor = conn.cursor()
-    cursor.execute("""
+    Database.execute_insert("""
         INSERT OR REPLACE INTO nutrition_goals 
         (user_id, calories_target, protein_target, carbs_target, fat_target, water_target_ml)
         VALUES (1, 2200, 160, 220, 70, 2500)
     """)
-    conn.commit()
     print("✓ Insertados objetivos nutricionales")
 
-def seed_food_logs(conn):
+def seed_food_logs():
     """Inserta registros de comida de todo el año."""
-    cursor = conn.cursor()
     today = date.today()
     
     # Obtener IDs de alimentos
-    cursor.execute("SELECT id, name, calories FROM foods")
-    foods = {row[1]: {'id': row[0], 'calories': row[2]} for row in cursor.fetchall()}
+    rows = Database.execute_query("SELECT id, name, calories FROM foods")
+    foods = {row['name']: {'id': row['id'], 'calories': row['calories']} for row in rows}
     
     # Comidas típicas por tipo
     breakfast_foods = ['Avena', 'Huevo entero', 'Pan integral', 'Plátano', 'Yogur griego', 'Leche desnatada', 'Proteína whey']
@@ -406,18 +380,14 @@ def seed_food_logs(conn):
                 quantity = random.randint(25, 80)
                 logs.append((1, foods[food_name]['id'], d.isoformat(), 'snack', quantity))
     
-    # Insertar en lotes para mayor eficiencia
-    for log in logs:
-        cursor.execute("""
-            INSERT INTO food_logs (user_id, food_id, log_date, meal_type, quantity)
-            VALUES (?, ?, ?, ?, ?)
-        """, log)
-    conn.commit()
+    Database.execute_many("""
+        INSERT INTO food_logs (user_id, food_id, log_date, meal_type, quantity)
+        VALUES (%s, %s, %s, %s, %s)
+    """, logs)
     print(f"✓ Insertados {len(logs)} registros de comida (1 año)")
 
-def seed_water_logs(conn):
+def seed_water_logs():
     """Inserta registros de agua de todo el año."""
-    cursor = conn.cursor()
     today = date.today()
     
     logs = []
@@ -437,20 +407,17 @@ def seed_water_logs(conn):
         
         logs.append((1, d.isoformat(), liters))
     
-    for log in logs:
-        cursor.execute("""
-            INSERT INTO water_logs (user_id, log_date, liters)
-            VALUES (?, ?, ?)
-        """, log)
-    conn.commit()
+    Database.execute_many("""
+        INSERT INTO water_logs (user_id, log_date, liters)
+        VALUES (%s, %s, %s)
+    """, logs)
     print(f"✓ Insertados {len(logs)} registros de agua (1 año)")
 
-def seed_training_plan(conn):
+def seed_training_plan():
     """Inserta un plan de entrenamiento."""
-    cursor = conn.cursor()
     
     # Crear plan
-    cursor.execute("""
+    Database.execute_insert("""
         INSERT OR REPLACE INTO training_plans (id, user_id, name, description, is_active)
         VALUES (1, 1, 'Push Pull Legs', 'Rutina de 6 días dividida en empuje, tirón y piernas', 1)
     """)
@@ -465,23 +432,20 @@ def seed_training_plan(conn):
         (6, 1, 5, 'Legs B - Isquios dominante'),
     ]
     
-    for day in days:
-        cursor.execute("""
-            INSERT OR REPLACE INTO training_days (id, plan_id, day_of_week, name)
-            VALUES (?, ?, ?, ?)
-        """, day)
+    Database.execute_many("""
+        INSERT OR REPLACE INTO training_days (id, plan_id, day_of_week, name)
+        VALUES (%s, %s, %s, %s)
+    """, days)
     
-    conn.commit()
     print("✓ Insertado plan de entrenamiento PPL")
 
-def seed_workout_sessions(conn):
+def seed_workout_sessions():
     """Inserta sesiones de entrenamiento de todo el año."""
-    cursor = conn.cursor()
     today = date.today()
     
     # Obtener IDs de ejercicios por nombre
-    cursor.execute("SELECT id, name FROM exercises")
-    exercise_ids = {row[1]: row[0] for row in cursor.fetchall()}
+    rows = Database.execute_query("SELECT id, name FROM exercises")
+    exercise_ids = {row['name']: row['id'] for row in rows}
     
     # Ejercicios por día
     push_exercises = ['Press banca', 'Press inclinado mancuernas', 'Aperturas mancuernas', 'Press militar', 'Elevaciones laterales', 'Extensiones en polea', 'Fondos en paralelas']
@@ -561,62 +525,64 @@ def seed_workout_sessions(conn):
         
         session_id += 1
     
-    for session in sessions:
-        cursor.execute("""
-            INSERT INTO workout_sessions (id, user_id, training_day_id, session_date, start_time, end_time)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, session)
+    Database.execute_many("""
+        INSERT INTO workout_sessions (id, user_id, training_day_id, session_date, start_time, end_time)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, sessions)
     
-    for s in sets:
-        cursor.execute("""
-            INSERT INTO workout_sets (session_id, exercise_id, set_number, weight_kg, reps, rpe)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, s)
+    Database.execute_many("""
+        INSERT INTO workout_sets (session_id, exercise_id, set_number, weight_kg, reps, rpe)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, sets)
     
-    conn.commit()
     print(f"✓ Insertadas {len(sessions)} sesiones de entrenamiento con {len(sets)} series (1 año)")
 
 def main():
     print("\n🏋️ Generando datos de prueba para GymGraph (1 AÑO COMPLETO)...\n")
     
-    conn = get_connection()
-    
     try:
-        # PRIMERO: Borrar todos los datos existentes
-        clear_all_data(conn)
-        
-        seed_foods(conn)
-        seed_exercises(conn)
-        seed_nutrition_goals(conn)
-        seed_measurements(conn)
-        seed_sleep_logs(conn)
-        seed_step_logs(conn)
-        seed_menstrual_logs(conn)
-        seed_water_logs(conn)
-        seed_food_logs(conn)
-        seed_training_plan(conn)
-        seed_workout_sessions(conn)
+        # Esquema y migraciones al día; después, todo en una sola transacción
+        Database.init_db()
+        with Database.transaction() as connection:
+            # PRIMERO: Borrar todos los datos existentes
+            clear_all_data()
+            
+            seed_foods()
+            seed_exercises()
+            seed_nutrition_goals()
+            seed_measurements()
+            seed_sleep_logs()
+            seed_step_logs()
+            seed_menstrual_logs()
+            seed_water_logs()
+            seed_food_logs()
+            seed_training_plan()
+            seed_workout_sessions()
+            
+            # Las series se insertan por lotes, sin el mantenimiento incremental de los
+            # modelos: recalcular los agregados diarios y los récords personales
+            Database.mark_written('daily_metrics', 'personal_records')
+            rows = rebuild_daily_metrics(connection)
+            records = rebuild_personal_records(connection)
+        print(f"✓ Recalculados {rows} días de métricas agregadas y {records} récords personales")
         
         print("\n✅ ¡Base de datos poblada con éxito!")
         print("\nResumen de datos generados:")
         
         # Contar registros
-        cursor = conn.cursor()
         tables = ['foods', 'exercises', 'body_measurements', 'sleep_logs', 
                   'step_logs', 'menstrual_logs', 'water_logs', 'food_logs',
-                  'training_plans', 'workout_sessions', 'workout_sets']
+                  'training_plans', 'workout_sessions', 'workout_sets', 'daily_metrics',
+                  'personal_records']
         
         for table in tables:
-            cursor.execute(f"SELECT COUNT(*) FROM {table}")
-            count = cursor.fetchone()[0]
+            count = Database.execute_query(f"SELECT COUNT(*) AS count FROM {table}", fetch_one=True)['count']
             print(f"  - {table}: {count} registros")
         
     except Exception as e:
         print(f"❌ Error: {e}")
         import traceback
         traceback.print_exc()
-    finally:
-        conn.close()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,144 @@
+/**
+ * GymGraph - Cola de escrituras sin conexión
+ * Las operaciones se guardan en localStorage y se envían juntas a /workout/api/sync.
+ * Cada una lleva una clave única, así que reenviarlas tras un fallo no duplica nada.
+ */
+
+const SyncQueue = (function() {
+    const STORAGE_KEY = 'gymgraph.syncQueue';
+    // Operaciones que el servidor rechazó: se apartan para no reenviarlas en cada intento
+    const REJECTED_KEY = 'gymgraph.syncRejected';
+    const SYNC_URL = '/workout/api/sync';
+    const BATCH_SIZE = 500;
+    let flushing = null;
+
+    function load(storageKey = STORAGE_KEY) {
+        try {
+            return JSON.parse(localStorage.getItem(storageKey)) || [];
+        } catch (error) {
+            return [];
+        }
+    }
+
+    function save(operations, storageKey = STORAGE_KEY) {
+        localStorage.setItem(storageKey, JSON.stringify(operations));
+    }
+
+    /**
+     * Saca operaciones de la cola y las guarda aparte con el motivo del rechazo.
+     */
+    function quarantine(operations, reasons) {
+        const keys = new Set(operations.map(operation => operation.key));
+        save(load().filter(operation => !keys.has(operation.key)));
+        const rejected = load(REJECTED_KEY);
+        operations.forEach(operation => {
+            rejected.push({ operation, error: reasons[operation.key] });
+        });
+        save(rejected, REJECTED_KEY);
+    }
+
+    function newKey() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+    }
+
+    /**
+     * Añade operaciones a la cola (se les asigna clave si no la traen).
+     */
+    function enqueue(...operations) {
+        const queue = load();
+        const queued = operations.map(operation => Object.assign({ key: newKey() }, operation));
+        const keys = new Set(queue.map(operation => operation.key));
+        queued.forEach(operation => {
+            if (!keys.has(operation.key)) {
+                queue.push(operation);
+            }
+        });
+        save(queue);
+        return queued;
+    }
+
+    /**
+     * Envía la cola en orden. Quita las operaciones con respuesta: las aplicadas o
+     * repetidas se descartan y las rechazadas (por operación, o el lote entero con un
+     * error 4xx) se apartan en rejected(). Si falla la red o el servidor (5xx) se
+     * conservan para el siguiente intento. Devuelve {clave: resultado}.
+     */
+    function flush() {
+        // Si ya hay un envío en curso, se vuelve a enviar al terminar (puede haber operaciones nuevas)
+        if (flushing) return flushing.catch(() => {}).then(flush);
+        flushing = (async () => {
+            const results = {};
+            while (true) {
+                const batch = load().slice(0, BATCH_SIZE);
+                if (batch.length === 0) break;
+
+                const response = await fetch(SYNC_URL, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ operations: batch })
+                });
+                if (response.status >= 400 && response.status < 500) {
+                    // El lote no es válido tal cual: reenviarlo fallaría siempre igual
+                    const data = await response.json().catch(() => ({}));
+                    const reasons = {};
+                    batch.forEach(operation => {
+                        reasons[operation.key] = data.error || `HTTP ${response.status}`;
+                        results[operation.key] = { key: operation.key, status: 'error', error: reasons[operation.key] };
+                    });
+                    console.warn('Lote rechazado:', response.status, data.error);
+                    quarantine(batch, reasons);
+                    continue;
+                }
+                if (!response.ok) {
+                    throw new Error(`HTTP error! status: ${response.status}`);
+                }
+                const data = await response.json();
+
+                const done = new Set();
+                const reasons = {};
+                data.results.forEach(result => {
+                    results[result.key] = result;
+                    done.add(result.key);
+                    if (result.status === 'error') {
+                        reasons[result.key] = result.error;
+                        console.warn('Operación rechazada:', result.key, result.error);
+                    }
+                });
+                // Las que no traen clave válida no vuelven con su clave: se apartan también
+                if (data.results.some(result => result.key === null)) {
+                    batch.filter(operation => !done.has(operation.key)).forEach(operation => {
+                        reasons[operation.key] = 'key obligatoria';
+                        done.add(operation.key);
+                    });
+                }
+                quarantine(batch.filter(operation => operation.key in reasons), reasons);
+                save(load().filter(operation => !done.has(operation.key)));
+                if (done.size === 0) break;
+            }
+            return results;
+        })().finally(() => { flushing = null; });
+        return flushing;
+    }
+
+    function pending() {
+        return load().length;
+    }
+
+    /**
+     * Operaciones rechazadas por el servidor: [{operation, error}].
+     */
+    function rejected() {
+        return load(REJECTED_KEY);
+    }
+
+    // Reintentar al recuperar la conexión y al abrir cualquier página
+    window.addEventListener('online', () => flush().catch(() => {}));
+    document.addEventListener('DOMContentLoaded', () => {
+        if (pending() > 0) flush().catch(() => {});
+    });
+
+    return { enqueue, flush, pending, rejected, newKey };
+})();
@@ -0,0 +1,102 @@
+"""
+Fixtures comunes: aplicación sobre una base de datos temporal
+"""
+
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.models.cache import chart_cache
+from app.models.database import Database
+
+# Base de datos de ejemplo del repositorio (esquema original, sin migrar)
+SAMPLE_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'data', 'gymgraph.db')
+
+
+def _use_database(monkeypatch, path):
+    """Apunta Database a `path` con el estado de conexión limpio."""
+    monkeypatch.setattr(Database, '_db_path', str(path))
+    monkeypatch.setattr(Database, '_initialized', False)
+    monkeypatch.setattr(Database, '_pool', None)
+    monkeypatch.setattr(Database, '_writer_connection', None)
+    monkeypatch.setattr(Database, '_data_version', None)
+    monkeypatch.setattr(Database, '_external_version', 0)
+
+
+def _close_database():
+    if Database._pool is not None:
+        Database._pool.close_all()
+    if Database._writer_connection is not None:
+        Database._writer_connection.close()
+
+
+@pytest.fixture
+def sample_db(tmp_path):
+    """Copia de la base de datos de ejemplo (con historial, sin migrar)."""
+    path = tmp_path / 'sample.db'
+    shutil.copy(SAMPLE_DB, path)
+    return path
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Aplicación sobre una base de datos nueva (esquema y migraciones al crearla)."""
+    _use_database(monkeypatch, tmp_path / 'gymgraph.db')
+    application = create_app()
+    application.config['TESTING'] = True
+    chart_cache.invalidate()
+    yield application
+    _close_database()
+
+
+@pytest.fixture
+def sample_app(sample_db, monkeypatch):
+    """Aplicación sobre la copia migrada de la base de datos de ejemplo."""
+    _use_database(monkeypatch, sample_db)
+    application = create_app()
+    application.config['TESTING'] = True
+    chart_cache.invalidate()
+    yield application
+    _close_database()
+
+
+def _login(application, user_id=1):
+    client = application.test_client()
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = user_id
+    return client
+
+
+@pytest.fixture
+def client(app):
+    """Cliente con la sesión del usuario local (id 1)."""
+    return _login(app)
+
+
+@pytest.fixture
+def sample_client(sample_app):
+    return _login(sample_app)
+
+
+@pytest.fixture
+def login():
+    """Cliente con la sesión de otro usuario: login(app, user_id)."""
+    return _login
+
+
+def create_user(user_id):
+    """Crea un usuario adicional."""
+    Database.execute_insert(
+        "INSERT INTO users (id, username, email, password_hash) VALUES (%s, %s, %s, %s)",
+        (user_id, f'user{user_id}', f'user{user_id}@local.app', 'local')
+    )
+
+
+def first_exercise_id():
+    return Database.execute_query("SELECT MIN(id) AS id FROM exercises", fetch_one=True)['id']
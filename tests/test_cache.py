@@ -0,0 +1,58 @@
+"""
+Caché de gráficas: invalidación tras escrituras de la aplicación y de otros procesos
+"""
+
+import sqlite3
+from datetime import date
+
+from app.models.database import Database
+from app.models.rollup import rebuild_daily_metrics
+
+CHART_URL = '/charts/api/data?metrics=weight'
+
+
+def _add_weight(client, weight_kg):
+    response = client.post('/measurement/new', data={
+        'measurement_date': date.today().isoformat(), 'weight_kg': weight_kg
+    })
+    assert response.status_code == 302
+
+
+def _external_weight(weight_kg):
+    """Escritura desde otra conexión, como seed_data.py (que también reconstruye daily_metrics)."""
+    connection = sqlite3.connect(Database._db_path)
+    connection.execute(
+        "INSERT INTO body_measurements (user_id, measurement_date, weight_kg) VALUES (1, ?, ?)",
+        (date.today().isoformat(), weight_kg)
+    )
+    rebuild_daily_metrics(connection)
+    connection.commit()
+    connection.close()
+
+
+def _weights(response):
+    return [point['value'] for point in response.get_json()['weight']]
+
+
+def test_chart_cache_invalidated_by_write(client):
+    _add_weight(client, 80)
+    assert client.get(CHART_URL).headers['X-Cache'] == 'MISS'
+    cached = client.get(CHART_URL)
+    assert cached.headers['X-Cache'] == 'HIT'
+    assert _weights(cached) == [80]
+
+    _add_weight(client, 82)
+    fresh = client.get(CHART_URL)
+    assert fresh.headers['X-Cache'] == 'MISS'
+    assert _weights(fresh) != [80]
+
+
+def test_chart_cache_invalidated_by_external_write(client):
+    client.get(CHART_URL)
+    assert client.get(CHART_URL).headers['X-Cache'] == 'HIT'
+
+    _external_weight(83)
+
+    fresh = client.get(CHART_URL)
+    assert fresh.headers['X-Cache'] == 'MISS'
+    assert _weights(fresh) == [83]
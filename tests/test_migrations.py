@@ -0,0 +1,81 @@
+"""
+Migraciones sobre una base de datos existente (copia de data/gymgraph.db)
+"""
+
+import sqlite3
+
+import pytest
+
+from app.models import migrations
+from app.models.migrations import MIGRATIONS, get_version, run_migrations
+
+
+def _connect(path):
+    connection = sqlite3.connect(str(path), isolation_level=None)
+    connection.execute("PRAGMA foreign_keys = ON")
+    return connection
+
+
+def _count(connection, table):
+    return connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def _indexes(connection):
+    rows = connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()
+    return {row[0] for row in rows}
+
+
+def test_upgrades_existing_database(sample_db):
+    connection = _connect(sample_db)
+    assert get_version(connection) == 0
+    sets_before = _count(connection, 'workout_sets')
+
+    assert run_migrations(connection) == MIGRATIONS[-1][0]
+    assert get_version(connection) == MIGRATIONS[-1][0]
+
+    # Los datos existentes se conservan y las tablas nuevas se rellenan con ellos
+    assert _count(connection, 'workout_sets') == sets_before
+    assert _count(connection, 'daily_metrics') > 0
+    assert _count(connection, 'personal_records') > 0
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(workout_sets)")}
+    assert 'is_warmup' in columns
+    assert {'idx_workout_sessions_user_date', 'idx_workout_sets_session',
+            'idx_workout_sessions_user_keyset'} <= _indexes(connection)
+    connection.close()
+
+
+def test_rerun_is_noop(sample_db):
+    connection = _connect(sample_db)
+    version = run_migrations(connection)
+    records = _count(connection, 'personal_records')
+
+    assert run_migrations(connection) == version
+    assert _count(connection, 'personal_records') == records
+    connection.close()
+
+
+def test_failed_migration_rolls_back(sample_db, monkeypatch):
+    connection = _connect(sample_db)
+    run_migrations(connection)
+    version = get_version(connection)
+    broken = (version + 1, 'Migración de prueba que falla', [
+        "CREATE TABLE broken_migration (id INTEGER PRIMARY KEY)",
+        "INSERT INTO missing_table VALUES (1)",
+    ])
+    monkeypatch.setattr(migrations, 'MIGRATIONS', MIGRATIONS + [broken])
+
+    with pytest.raises(sqlite3.OperationalError):
+        run_migrations(connection)
+
+    assert get_version(connection) == version
+    assert 'broken_migration' not in {
+        row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+    connection.close()
+
+
+def test_app_migrates_on_startup(sample_app):
+    from app.models.database import Database
+
+    row = Database.execute_query("PRAGMA user_version", fetch_one=True)
+    assert list(row.values())[0] == MIGRATIONS[-1][0]
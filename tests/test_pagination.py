@@ -0,0 +1,109 @@
+"""
+Paginación por cursor: ida y vuelta del cursor, cursores no válidos y páginas de la API
+"""
+
+import base64
+import json
+
+import pytest
+
+from app.models.database import Database
+from app.models.pagination import CursorError, decode_cursor, encode_cursor
+
+
+def _raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor('2024-05-01', 42)
+    assert decode_cursor(cursor, 2) == ('2024-05-01', 42)
+    # URL segura y sin relleno
+    assert '=' not in cursor and '+' not in cursor and '/' not in cursor
+
+
+@pytest.mark.parametrize('cursor', [
+    'no es un cursor',
+    '!!!',
+    _raw_cursor({'date': '2024-05-01'}),
+    _raw_cursor(['2024-05-01']),
+    _raw_cursor(['2024-05-01', 42, 3]),
+    _raw_cursor(['2024-05-01', True]),
+    _raw_cursor(['2024-05-01', 4.5]),
+    _raw_cursor(['2024-05-01', None]),
+])
+def test_invalid_cursor(cursor):
+    with pytest.raises(CursorError):
+        decode_cursor(cursor, 2)
+
+
+def _pages(client, url, items_key):
+    """Recorre todas las páginas de un listado siguiendo next_cursor."""
+    items, cursor = [], None
+    while True:
+        query = f'{url}?limit=7' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(query)
+        assert response.status_code == 200
+        body = response.get_json()
+        items.extend(body[items_key])
+        cursor = body['next_cursor']
+        if cursor is None:
+            return items
+
+
+def _busiest_exercise():
+    return Database.execute_query(
+        """
+        SELECT ws.exercise_id, COUNT(*) AS n
+        FROM workout_sets ws JOIN workout_sessions wss ON wss.id = ws.session_id
+        WHERE wss.user_id = 1
+        GROUP BY ws.exercise_id ORDER BY n DESC LIMIT 1
+        """, fetch_one=True
+    )
+
+
+def test_sessions_pages_cover_history(sample_client):
+    sessions = _pages(sample_client, '/workout/api/sessions', 'sessions')
+    expected = Database.execute_query(
+        "SELECT id FROM workout_sessions WHERE user_id = 1 ORDER BY session_date DESC, id DESC"
+    )
+    assert len(expected) > 7
+    assert [s['id'] for s in sessions] == [row['id'] for row in expected]
+
+
+def test_exercise_history_pages_cover_history(sample_client):
+    exercise = _busiest_exercise()
+    url = f"/workout/api/exercises/{exercise['exercise_id']}/history"
+
+    sets = _pages(sample_client, url, 'sets')
+
+    assert len(sets) == exercise['n']
+    assert len({s['id'] for s in sets}) == len(sets)
+    dates = [s['session_date'] for s in sets]
+    assert dates == sorted(dates, reverse=True)
+
+
+def test_exercise_history_without_params_is_a_list(sample_client):
+    exercise = _busiest_exercise()
+    url = f"/workout/api/exercises/{exercise['exercise_id']}/history"
+
+    response = sample_client.get(url)
+
+    assert isinstance(response.get_json(), list)
+    assert len(response.get_json()) == 20
+    following = sample_client.get(f"{url}?cursor={response.headers['X-Next-Cursor']}")
+    assert following.get_json()['sets'][0]['id'] not in {s['id'] for s in response.get_json()}
+
+
+@pytest.mark.parametrize('query', [
+    'cursor=basura',
+    f"cursor={encode_cursor('2024-05-01')}",
+    'limit=abc',
+    'limit=0',
+    'limit=201',
+])
+def test_bad_page_params_are_400(client, query):
+    for url in ('/workout/api/sessions', '/workout/api/exercises/1/history'):
+        response = client.get(f'{url}?{query}')
+        assert response.status_code == 400
+        assert 'error' in response.get_json()
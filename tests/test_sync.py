@@ -0,0 +1,99 @@
+"""
+Sincronización de entrenamientos: idempotencia y sesiones de otros usuarios
+"""
+
+from app.models.database import Database
+from conftest import create_user, first_exercise_id
+
+
+def _sync(client, operations):
+    response = client.post('/workout/api/sync', json={'operations': operations})
+    assert response.status_code == 200
+    return response.get_json()['results']
+
+
+def _count_sets():
+    return Database.execute_query("SELECT COUNT(*) AS n FROM workout_sets", fetch_one=True)['n']
+
+
+def _operations(exercise_id):
+    return [
+        {'key': 's1', 'type': 'start_session', 'session_date': '2024-05-01', 'start_time': '10:00:00'},
+        {'key': 'a1', 'type': 'add_set', 'session_key': 's1', 'exercise_id': exercise_id,
+         'set_number': 1, 'weight_kg': 60, 'reps': 8},
+        {'key': 'a2', 'type': 'add_set', 'session_key': 's1', 'exercise_id': exercise_id,
+         'set_number': 2, 'weight_kg': 60, 'reps': 8, 'is_warmup': False},
+        {'key': 'e1', 'type': 'end_session', 'session_key': 's1', 'end_time': '11:00:00'},
+    ]
+
+
+def test_resend_is_duplicate(client):
+    operations = _operations(first_exercise_id())
+
+    first = _sync(client, operations)
+    assert [result['status'] for result in first] == ['applied'] * 4
+    assert _count_sets() == 2
+
+    second = _sync(client, operations)
+    assert [result['status'] for result in second] == ['duplicate'] * 4
+    assert [result.get('set_id') for result in second] == [result.get('set_id') for result in first]
+    assert _count_sets() == 2
+
+
+def test_repeated_key_in_same_batch(client):
+    operations = _operations(first_exercise_id())
+    results = _sync(client, operations + [operations[1]])
+
+    assert results[-1]['status'] == 'duplicate'
+    assert results[-1]['set_id'] == results[1]['set_id']
+    assert _count_sets() == 2
+
+
+def test_rejects_foreign_session(app, client, login):
+    create_user(2)
+    other = login(app, 2)
+    started = _sync(other, [{'key': 'other', 'type': 'start_session'}])[0]
+    foreign_id = started['session_id']
+
+    results = _sync(client, [
+        {'key': 'x1', 'type': 'add_set', 'session_id': foreign_id, 'exercise_id': first_exercise_id(),
+         'set_number': 1, 'weight_kg': 100, 'reps': 5},
+        {'key': 'x2', 'type': 'end_session', 'session_id': foreign_id},
+        # La clave de sesión es por usuario: la del otro usuario no se resuelve
+        {'key': 'x3', 'type': 'end_session', 'session_key': 'other'},
+    ])
+
+    assert [result['status'] for result in results] == ['error'] * 3
+    assert all(result['error'] == 'Sesión no encontrada' for result in results)
+    assert _count_sets() == 0
+    end_time = Database.execute_query(
+        "SELECT end_time FROM workout_sessions WHERE id = %s", (foreign_id,), fetch_one=True
+    )['end_time']
+    assert end_time is None
+
+
+def test_invalid_operation_does_not_block_others(client):
+    operations = _operations(first_exercise_id())
+    operations.insert(2, {'key': 'bad', 'type': 'add_set', 'session_key': 's1', 'exercise_id': 999999,
+                          'set_number': 3, 'weight_kg': 60, 'reps': 8})
+
+    results = _sync(client, operations)
+
+    assert [result['status'] for result in results] == ['applied', 'applied', 'error', 'applied', 'applied']
+    assert _count_sets() == 2
+    # La operación rechazada no se guarda: puede reenviarse corregida
+    operations[2]['exercise_id'] = first_exercise_id()
+    assert _sync(client, [operations[2]])[0]['status'] == 'applied'
+
+
+def test_rest_api_rejects_foreign_session(app, client, login):
+    create_user(2)
+    foreign_id = _sync(login(app, 2), [{'key': 'other', 'type': 'start_session'}])[0]['session_id']
+    body = {'exercise_id': first_exercise_id(), 'set_number': 1, 'weight_kg': 100, 'reps': 5}
+
+    assert client.post(f'/workout/api/sessions/{foreign_id}/sets', json=body).status_code == 404
+    assert client.post(f'/workout/api/sessions/{foreign_id}/sets/batch',
+                       json={'sets': [body]}).status_code == 404
+    assert client.post(f'/workout/api/sessions/{foreign_id}/end').status_code == 404
+    assert client.post('/workout/api/sessions/999999/end').status_code == 404
+    assert _count_sets() == 0
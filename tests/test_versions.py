@@ -0,0 +1,57 @@
+"""
+ETags: 304 hasta que la aplicación u otro proceso escribe en la base de datos
+"""
+
+import sqlite3
+from datetime import date
+
+from app.models.database import Database
+
+MEASUREMENTS_URL = '/measurement/api/weight-history'
+
+
+def _add_weight(client, weight_kg):
+    response = client.post('/measurement/new', data={
+        'measurement_date': date.today().isoformat(), 'weight_kg': weight_kg
+    })
+    assert response.status_code == 302
+
+
+def _external_weight(weight_kg):
+    """Escritura desde otra conexión, como seed_data.py o un comando flask."""
+    connection = sqlite3.connect(Database._db_path)
+    connection.execute(
+        "INSERT INTO body_measurements (user_id, measurement_date, weight_kg) VALUES (1, ?, ?)",
+        (date.today().isoformat(), weight_kg)
+    )
+    connection.commit()
+    connection.close()
+
+
+def test_etag_returns_304_until_write(client):
+    first = client.get(MEASUREMENTS_URL)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    assert client.get(MEASUREMENTS_URL, headers={'If-None-Match': etag}).status_code == 304
+
+    _add_weight(client, 80)
+    changed = client.get(MEASUREMENTS_URL, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_etag_changes_after_external_write(client):
+    etag = client.get(MEASUREMENTS_URL).headers['ETag']
+
+    _external_weight(81)
+
+    changed = client.get(MEASUREMENTS_URL, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_own_writes_do_not_count_as_external(client):
+    version = Database.external_version()
+    _add_weight(client, 80)
+    assert Database.external_version() == version